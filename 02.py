@@ -1,361 +1,469 @@
 import os
 import time
 import json
-import requests
+import qa_dates
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from typing import List, Tuple, Dict, Any
+from typing import Iterable, Iterator, List, Optional, Tuple, Dict, Any
+from itertools import count, islice
+from pipeline import store
+from monday_api import (
+    AdaptiveBatchSize,
+    add_to_listing,
+    board_columns,
+    date_rule_params,
+    is_complexity_error,
+    post_query,
+    stream_board_items,
+)
 from requests.exceptions import RequestException
 
 load_dotenv()
-api = os.getenv("MONDAY_API_KEY")
-
-dir = "data/reference/init.json"
-with open(dir, "r") as f:
-    init_data = json.load(f)
-
-data = []
-for item in init_data:
-    data.append(item["Board_id"])
-boards = [int(item) for item in data]
-
-b = [6324705748]
-for board in boards:
-    print(f"Fetching data for board {board}...")
-    load_dotenv()
-    url = "https://api.monday.com/v2"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": api,
-    }
 
-    def fetch_items_from_board(board_id: int) -> List[dict]:
-        """Fetch all items from a specified board."""
-        query = (
-            """
-        query {
-            boards(ids: %d) {
-                groups {
-                    title
-                    id
-                    items_page(limit: 200) {
-                        cursor
-                        items {
-                            id
-                            name
-                            created_at
-                            updated_at
-                        }
-                    }
-                }
+# Boards fetched at the same time; monday_api caps the requests in flight
+BOARD_WORKERS = int(os.getenv("MONDAY_BOARD_WORKERS", "4"))
+
+# Columns read by DataProcessor in the 03 notes cleaners
+NOTE_COLUMN_TITLES = [
+    "Date",
+    "Start Time",
+    "End Time",
+    "Manual units",
+    "Units",
+    "Manual Units",
+    "Service Type",
+    "Provided As",
+    "Service Line",
+    "Session Status",
+    "Signature",
+]
+# Updates fetched per item; monday returns at most 25 when no limit is given
+UPDATES_LIMIT = int(os.getenv("MONDAY_UPDATES_LIMIT", "5"))
+FULL_UPDATES_LIMIT = 25
+
+
+def load_board_ids(path: str = "data/reference/init.json") -> List[int]:
+    """Read every staff Board_id from the reference data."""
+    init_data = store.load(path)
+    return [int(item["Board_id"]) for item in init_data]
+
+
+def date_query_params(
+    board_id: int, start_date: Optional[str], end_date: Optional[str]
+) -> Optional[dict]:
+    """Build the server-side Date filter of a board, if a range is set."""
+    if not start_date:
+        return None
+    date_column = board_columns(board_id).get("Date")
+    if not date_column:
+        print(f"No Date column on board {board_id}, fetching every item")
+        return None
+    return date_rule_params(date_column, start_date, end_date or start_date)
+
+
+def fetch_items_from_board(
+    board_id: int, monday_data: dict, query_params: Optional[dict] = None
+) -> Iterator[dict]:
+    """Stream all items from a specified board, page by page."""
+    for group, items in stream_board_items(
+        board_id,
+        "id name created_at updated_at",
+        page_limit=200,
+        query_params=query_params,
+    ):
+        add_to_listing(monday_data, group, items)
+        for item in items:
+            yield {
+                "id": item.get("id"),
+                "name": item.get("name"),
+                "created_at": item.get("created_at"),
+                "updated_at": item.get("updated_at"),
             }
-        }
-        """
-            % board_id
-        )
 
-        response = requests.post(url, json={"query": query}, headers=headers)
-        if response.status_code == 200:
-            data = response.json()
-            with open("monday_response.json", "w") as json_file:
-                json.dump(data, json_file, indent=4)
-
-            items_data = []
-            for board in data.get("data", {}).get("boards", []):
-                for group in board.get("groups", []):
-                    items = group.get("items_page", {}).get("items", [])
-                    for item in items:
-                        items_data.append(
-                            {
-                                "id": item.get("id"),
-                                "name": item.get("name"),
-                                "created_at": item.get("created_at"),
-                                "updated_at": item.get("updated_at"),
-                            }
+def make_request_with_retry(
+    query: str,
+    variables: dict,
+    batch_num: str,
+    max_retries: int = 3,
+    initial_delay: float = 1.0,
+) -> Tuple[dict, bool]:
+    """Make a request with retry logic and exponential backoff."""
+    delay = initial_delay
+
+    for attempt in range(max_retries):
+        try:
+            # The shared scheduler paces this against the complexity budget
+            response = post_query(query, variables, timeout=30)
+
+            print(f"Batch {batch_num} - Attempt {attempt + 1}:")
+            print(f"Status Code: {response.status_code}")
+
+            if response.status_code == 200:
+                response_data = response.json()
+
+                if "errors" in response_data:
+                    print(f"GraphQL Errors in batch {batch_num}:")
+                    print(json.dumps(response_data["errors"], indent=2))
+
+                    error_messages = [
+                        error.get("message", "").lower()
+                        for error in response_data.get("errors", [])
+                    ]
+                    if any(
+                        "complexity" in msg or "limit" in msg
+                        for msg in error_messages
+                    ):
+                        print(
+                            f"Detected complexity/limit error in batch {batch_num}"
                         )
-            return items_data
-        else:
-            print(f"Error fetching items from board {board_id}")
-            print(f"Response: {response.text}")
-        return []
-
-    def make_request_with_retry(
-        query: str,
-        variables: dict,
-        batch_num: int,
-        max_retries: int = 3,
-        initial_delay: float = 20,
-    ) -> Tuple[dict, bool]:
-        """Make a request with retry logic and exponential backoff."""
-        delay = initial_delay
-
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(
-                    url,
-                    json={"query": query, "variables": variables},
-                    headers=headers,
-                    timeout=30,
-                )
-
-                print(f"Batch {batch_num} - Attempt {attempt + 1}:")
-                print(f"Status Code: {response.status_code}")
-
-                if response.status_code == 200:
-                    response_data = response.json()
-
-                    if "errors" in response_data:
-                        print(f"GraphQL Errors in batch {batch_num}:")
-                        print(json.dumps(response_data["errors"], indent=2))
-
-                        error_messages = [
-                            error.get("message", "").lower()
-                            for error in response_data.get("errors", [])
-                        ]
-                        if any(
-                            "complexity" in msg or "limit" in msg
-                            for msg in error_messages
-                        ):
-                            print(
-                                f"Detected complexity/limit error in batch {batch_num}"
-                            )
-                            return response_data, False
-
-                        if attempt < max_retries - 1:
-                            time.sleep(delay)
-                            delay *= 2
-                            continue
                         return response_data, False
 
-                    items = response_data.get("data", {}).get("items", [])
-                    if not items:
-                        print(f"Warning: Batch {batch_num} returned no items")
-                        print("Response data:", json.dumps(response_data, indent=2))
+                    if attempt < max_retries - 1:
+                        time.sleep(delay)
+                        delay *= 2
+                        continue
+                    return response_data, False
 
-                    return response_data, True
+                items = response_data.get("data", {}).get("items", [])
+                if not items:
+                    print(f"Warning: Batch {batch_num} returned no items")
+                    print("Response data:", json.dumps(response_data, indent=2))
 
-                if response.status_code == 429:
-                    print(
-                        f"Rate limited on batch {batch_num}. Waiting {delay} seconds..."
-                    )
-                    time.sleep(delay)
-                    delay *= 2
-                    continue
+                return response_data, True
 
+            if response.status_code == 429:
                 print(
-                    f"Unexpected status code {response.status_code} on batch {batch_num}"
+                    f"Rate limited on batch {batch_num}. Waiting {delay} seconds..."
                 )
-                print(f"Response: {response.text}")
+                time.sleep(delay)
+                delay *= 2
+                continue
 
-                if attempt < max_retries - 1:
-                    time.sleep(delay)
-                    delay *= 2
-                    continue
+            print(
+                f"Unexpected status code {response.status_code} on batch {batch_num}"
+            )
+            print(f"Response: {response.text}")
 
-            except RequestException as e:
-                print(
-                    f"Request failed on batch {batch_num}, attempt {attempt + 1}: {str(e)}"
-                )
-                if attempt < max_retries - 1:
-                    time.sleep(delay)
-                    delay *= 2
-                    continue
-
-        return {"data": {"items": []}}, False
-
-    def fetch_updates_in_batches(item_ids: List[str], batch_size: int = 25) -> dict:
-        """Fetch updates for items in batches with retry logic and rate limiting."""
-        all_updates = {"data": {"items": []}}
-        successful_count = 0
-
-        for i in range(0, len(item_ids), batch_size):
-            batch = item_ids[i : i + batch_size]
-            batch_num = i // batch_size + 1
-            total_batches = -(-len(item_ids) // batch_size)
+            if attempt < max_retries - 1:
+                time.sleep(delay)
+                delay *= 2
+                continue
+
+        except RequestException as e:
             print(
-                f"\nProcessing batch {batch_num} of {total_batches} (Items {i+1}-{min(i+batch_size, len(item_ids))})"
+                f"Request failed on batch {batch_num}, attempt {attempt + 1}: {str(e)}"
             )
+            if attempt < max_retries - 1:
+                time.sleep(delay)
+                delay *= 2
+                continue
+
+    return {"data": {"items": []}}, False
+
+
+def note_column_ids(
+    board_id: int, column_titles: List[str] = NOTE_COLUMN_TITLES
+) -> Optional[List[str]]:
+    """Resolve the ids of the columns the notes cleaner reads on a board."""
+    columns = board_columns(board_id)
+    column_ids = [columns[title] for title in column_titles if title in columns]
+    if not column_ids:
+        print(f"Could not resolve note columns of board {board_id}, fetching all")
+        return None
+    return column_ids
+
+
+def fetch_updates_in_batches(
+    item_ids: Iterable[str],
+    board_id: int,
+    column_titles: List[str] = NOTE_COLUMN_TITLES,
+) -> Tuple[dict, int]:
+    """Fetch updates for items in adaptively sized batches as their IDs stream in.
+
+    Only the columns named in column_titles are read, all of them if none
+    of the titles resolve on the board.
+    """
+    all_updates = {"data": {"items": []}}
+    successful_count = 0
+    fetched_count = 0
+    batch_size = AdaptiveBatchSize(board_id)
+    column_ids = note_column_ids(board_id, column_titles)
+    remaining_ids = iter(item_ids)
+
+    for batch_num in count(1):
+        batch = list(islice(remaining_ids, batch_size.size))
+        if not batch:
+            break
+        batch_label = f"{board_id}/{batch_num}"
+        print(
+            f"\nProcessing batch {batch_label} (Items {fetched_count+1}-{fetched_count+len(batch)})"
+        )
+        fetched_count += len(batch)
 
-            updates_query = """
-            query GetItemUpdates($itemIds: [ID!]!) {
-                items(ids: $itemIds) {
-                    id
-                    name
-                    created_at
-                    updated_at
-                    updates {
-                        id
-                        text_body
-                        created_at
-                        updated_at 
-                    }
-                    column_values {
-                        column {
-                            title
-                        }
-                        value
-                        type
-                        ... on StatusValue {
-                            label
-                            update_id
-                        }
-                    }
+        received_items = fetch_update_batch(
+            batch, batch_label, batch_size, column_ids
+        )
+        if received_items:
+            all_updates["data"]["items"].extend(received_items)
+            successful_count += len(received_items)
+            print(
+                f"Successfully retrieved {len(received_items)} items in this batch"
+            )
+        else:
+            print(f"Failed to retrieve any items in batch {batch_label}")
+
+    batch_size.save()
+    return all_updates, successful_count
+
+
+def fetch_update_batch(
+    batch: List[str],
+    batch_label: str,
+    batch_size: AdaptiveBatchSize,
+    column_ids: Optional[List[str]] = None,
+    updates_limit: int = UPDATES_LIMIT,
+) -> List[dict]:
+    """Fetch one batch, halving it recursively on complexity errors."""
+    updates_query = """
+    query GetItemUpdates($itemIds: [ID!]!, $columnIds: [String!], $updatesLimit: Int!) {
+        items(ids: $itemIds) {
+            id
+            updates(limit: $updatesLimit) {
+                id
+                text_body
+                created_at
+            }
+            column_values(ids: $columnIds) {
+                column {
+                    title
+                }
+                value
+                ... on StatusValue {
+                    label
                 }
             }
-            """
-
-            variables = {"itemIds": list(map(str, batch))}
+        }
+    }
+    """
 
-            batch_data, success = make_request_with_retry(
-                updates_query, variables, batch_num
-            )
+    variables = {
+        "itemIds": list(map(str, batch)),
+        "columnIds": column_ids,
+        "updatesLimit": updates_limit,
+    }
 
-            if success and batch_data.get("data", {}).get("items"):
-                received_items = batch_data["data"]["items"]
-                all_updates["data"]["items"].extend(received_items)
-                successful_count += len(received_items)
-                print(
-                    f"Successfully retrieved {len(received_items)} items in this batch"
-                )
-            else:
-                print(f"Failed to retrieve any items in batch {batch_num}")
+    batch_data, success = make_request_with_retry(
+        updates_query, variables, batch_label
+    )
+
+    if success:
+        batch_size.succeeded(len(batch))
+        items = batch_data.get("data", {}).get("items") or []
+        if updates_limit < FULL_UPDATES_LIMIT:
+            refetch_truncated_updates(items, batch_label, updates_limit)
+        return items
+
+    if is_complexity_error(batch_data) and len(batch) > 1:
+        batch_size.failed(len(batch))
+        middle = len(batch) // 2
+        print(
+            f"Splitting batch {batch_label} into {middle} and {len(batch) - middle} items"
+        )
+        return fetch_update_batch(
+            batch[:middle], f"{batch_label}a", batch_size, column_ids, updates_limit
+        ) + fetch_update_batch(
+            batch[middle:], f"{batch_label}b", batch_size, column_ids, updates_limit
+        )
 
-            if i + batch_size < len(item_ids):
-                time.sleep(1.5)
+    return []
 
-        return all_updates, successful_count
 
-    def create_updates_dictionary(
-        updates_data: dict,
-    ) -> Tuple[Dict[str, list], Dict[str, list]]:
-        """Create dictionaries of updates and column values indexed by item ID."""
-        try:
-            updates_dict = {}
-            columns_dict = {}
+def refetch_truncated_updates(
+    items: List[dict], batch_label: str, updates_limit: int
+) -> None:
+    """Re-read the updates of items that filled the short updates limit.
 
-            for item in updates_data.get("data", {}).get("items", []):
+    The cleaner takes the last update in the list, so an item whose updates
+    were cut short is fetched again with monday's full default depth.
+    """
+    truncated = {
+        item["id"]: item
+        for item in items
+        if len(item.get("updates") or []) >= updates_limit
+    }
+    if not truncated:
+        return
+
+    full_query = """
+    query GetFullUpdates($itemIds: [ID!]!, $updatesLimit: Int!) {
+        items(ids: $itemIds) {
+            id
+            updates(limit: $updatesLimit) {
+                id
+                text_body
+                created_at
+            }
+        }
+    }
+    """
+    variables = {"itemIds": list(truncated), "updatesLimit": FULL_UPDATES_LIMIT}
+    full_data, success = make_request_with_retry(
+        full_query, variables, f"{batch_label}-updates"
+    )
+    if not success:
+        print(f"Could not re-read long update histories in batch {batch_label}")
+        return
+    for item in full_data.get("data", {}).get("items") or []:
+        if item.get("id") in truncated:
+            truncated[item["id"]]["updates"] = item.get("updates", [])
+
+
+def create_updates_dictionary(
+    updates_data: dict,
+) -> Tuple[Dict[str, list], Dict[str, list]]:
+    """Create dictionaries of updates and column values indexed by item ID."""
+    try:
+        updates_dict = {}
+        columns_dict = {}
+
+        for item in updates_data.get("data", {}).get("items", []):
+            if "id" in item:
+                item_id = item["id"]
+                if "updates" in item:
+                    updates_dict[item_id] = item["updates"]
+                if "column_values" in item:
+                    columns_dict[item_id] = item["column_values"]
+
+        return updates_dict, columns_dict
+    except (KeyError, AttributeError) as e:
+        print(f"Error processing data: {e}")
+        raise
+
+def update_items(
+    data: Any, updates_by_id: Dict[str, list], columns_by_id: Dict[str, list]
+) -> None:
+    """Recursively update items with their corresponding updates and column values."""
+    if isinstance(data, dict):
+        if "items" in data:
+            for item in data.get("items", []):
                 if "id" in item:
                     item_id = item["id"]
-                    if "updates" in item:
-                        updates_dict[item_id] = item["updates"]
-                    if "column_values" in item:
-                        columns_dict[item_id] = item["column_values"]
-
-            return updates_dict, columns_dict
-        except (KeyError, AttributeError) as e:
-            print(f"Error processing data: {e}")
-            raise
-
-    def update_items(
-        data: Any, updates_by_id: Dict[str, list], columns_by_id: Dict[str, list]
-    ) -> None:
-        """Recursively update items with their corresponding updates and column values."""
-        if isinstance(data, dict):
-            if "items" in data:
-                for item in data.get("items", []):
-                    if "id" in item:
-                        item_id = item["id"]
-                        if item_id in updates_by_id:
-                            item["updates"] = updates_by_id[item_id]
-                        if item_id in columns_by_id:
-                            item["column_values"] = columns_by_id[item_id]
-
-            for value in data.values():
-                update_items(value, updates_by_id, columns_by_id)
-        elif isinstance(data, list):
-            for item in data:
-                update_items(item, updates_by_id, columns_by_id)
-
-    def merge_responses(monday_data: dict, updates_data: dict) -> dict:
-        """Merge the Monday data with updates and column values data."""
-        try:
-            updates_by_id, columns_by_id = create_updates_dictionary(updates_data)
-
-            merged_data = monday_data.copy()
-
-            update_items(merged_data, updates_by_id, columns_by_id)
-
-            return merged_data
-        except Exception as e:
-            print(f"Error merging responses: {e}")
-            raise
-
-    def main():
-        board_id = board
-        items_data = fetch_items_from_board(board_id)
-        print(f"Found {len(items_data)} items")
-
-        # Extract just IDs for updates query
-        item_ids = [item["id"] for item in items_data]
-        all_updates, successful_count = fetch_updates_in_batches(item_ids)
-
-        with open("item_updates.json", "w") as updates_file:
-            json.dump(all_updates, updates_file, indent=4)
-
-        print("\nFinal Summary:")
-        print(f"Total items: {len(items_data)}")
-        print(f"Successfully processed: {successful_count}")
+                    if item_id in updates_by_id:
+                        item["updates"] = updates_by_id[item_id]
+                    if item_id in columns_by_id:
+                        item["column_values"] = columns_by_id[item_id]
+
+        for value in data.values():
+            update_items(value, updates_by_id, columns_by_id)
+    elif isinstance(data, list):
+        for item in data:
+            update_items(item, updates_by_id, columns_by_id)
+
+def merge_responses(monday_data: dict, updates_data: dict) -> dict:
+    """Merge the Monday data with updates and column values data."""
+    try:
+        updates_by_id, columns_by_id = create_updates_dictionary(updates_data)
+
+        merged_data = monday_data.copy()
+
+        update_items(merged_data, updates_by_id, columns_by_id)
+
+        return merged_data
+    except Exception as e:
+        print(f"Error merging responses: {e}")
+        raise
+
+def merge_statistics(merged_data: dict) -> Tuple[int, int, int]:
+    """Count the items, updates and column values in merged board data."""
+    total_items = sum(
+        len(group.get("items_page", {}).get("items", []))
+        for board in merged_data.get("data", {}).get("boards", [])
+        for group in board.get("groups", [])
+    )
+
+    total_updates = sum(
+        len(item.get("updates", []))
+        for board in merged_data.get("data", {}).get("boards", [])
+        for group in board.get("groups", [])
+        for item in group.get("items_page", {}).get("items", [])
+        if "updates" in item
+    )
+
+    total_columns = sum(
+        len(item.get("column_values", []))
+        for board in merged_data.get("data", {}).get("boards", [])
+        for group in board.get("groups", [])
+        for item in group.get("items_page", {}).get("items", [])
+        if "column_values" in item
+    )
+    return total_items, total_updates, total_columns
+
+
+def fetch_board(
+    board_id: int,
+    output_dir: str = "data/notes/raw_notes",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> str:
+    """Fetch one board with its updates and write its raw notes file."""
+    print(f"Fetching data for board {board_id}...")
+    query_params = date_query_params(board_id, start_date, end_date)
+
+    # Update batches start while the listing is still paging
+    monday_data = {}
+    item_ids = (
+        item["id"]
+        for item in fetch_items_from_board(board_id, monday_data, query_params)
+    )
+    all_updates, successful_count = fetch_updates_in_batches(item_ids, board_id)
+
+    merged_data = merge_responses(monday_data, all_updates)
+
+    output_path = os.path.join(output_dir, f"{board_id}.json")
+    store.save(output_path, merged_data, indent=2)
+
+    total_items, total_updates, total_columns = merge_statistics(merged_data)
+    print(f"\nBoard {board_id} summary:")
+    print(f"Total items processed: {total_items}")
+    print(f"Successfully processed: {successful_count}")
+    print(f"Total updates merged: {total_updates}")
+    print(f"Total column values merged: {total_columns}")
+    return output_path
+
+
+def fetch_boards(
+    board_ids: List[int],
+    workers: int = BOARD_WORKERS,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> List[str]:
+    """Fetch several boards at once, each into its own raw notes file."""
+    written = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {
+            executor.submit(
+                fetch_board, board_id, start_date=start_date, end_date=end_date
+            ): board_id
+            for board_id in board_ids
+        }
+        for future in as_completed(futures):
+            try:
+                written.append(future.result())
+            except Exception as e:
+                print(f"Error fetching board {futures[future]}: {str(e)}")
+    return written
 
-    def load_json_file(filename: str) -> dict:
-        """Load and validate a JSON file."""
-        try:
-            with open(filename, "r") as f:
-                data = json.load(f)
-            return data
-        except FileNotFoundError:
-            print(f"Error: {filename} not found")
-            raise
-        except json.JSONDecodeError:
-            print(f"Error: {filename} contains invalid JSON")
-            raise
-
-    def merger():
-        print("Loading JSON files...")
-        monday_data = load_json_file("monday_response.json")
-        updates_data = load_json_file("item_updates.json")
-
-        print("Merging responses...")
-        merged_data = merge_responses(monday_data, updates_data)
-
-        print("Saving merged data...")
-        with open(f"data/notes/raw_notes/{board}.json", "w") as f:
-            json.dump(merged_data, f, indent=2)
-
-        print("Successfully created merged data file")
-
-        total_items = sum(
-            len(group.get("items_page", {}).get("items", []))
-            for board in merged_data.get("data", {}).get("boards", [])
-            for group in board.get("groups", [])
-        )
 
-        total_updates = sum(
-            len(item.get("updates", []))
-            for board in merged_data.get("data", {}).get("boards", [])
-            for group in board.get("groups", [])
-            for item in group.get("items_page", {}).get("items", [])
-            if "updates" in item
-        )
+def main():
+    # Only fetch notes dated within NOTES_START_DATE..NOTES_END_DATE (US
+    # Central, YYYY-MM-DD); by default the day the run checks
+    start_date = os.getenv("NOTES_START_DATE") or qa_dates.target_date()
+    end_date = os.getenv("NOTES_END_DATE") or start_date
+    written = fetch_boards(
+        load_board_ids(), start_date=start_date, end_date=end_date
+    )
+    print(f"\nFetched {len(written)} boards")
 
-        total_columns = sum(
-            len(item.get("column_values", []))
-            for board in merged_data.get("data", {}).get("boards", [])
-            for group in board.get("groups", [])
-            for item in group.get("items_page", {}).get("items", [])
-            if "column_values" in item
-        )
 
-        print("\nMerge Statistics:")
-        print(f"Total items processed: {total_items}")
-        print(f"Total updates merged: {total_updates}")
-        print(f"Total column values merged: {total_columns}")
-
-        print("\nCleaning up directory...")
-        os.remove("monday_response.json")
-        os.remove("item_updates.json")
-        print("Successfully cleaned up directory")
-        print("\nMerging complete!")
-        time.sleep(45)
-
-    if __name__ == "__main__":
-        main()
-        merger()
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,12 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
 from typing import Dict, List, Optional
 import os
 from typing import Any
-from pytz import timezone
 import pytz
-from pathlib import Path
+import qa_dates
+from pipeline import store
+from qa_dates import validate_date
 
 
 
@@ -113,11 +114,8 @@ def process_json_data(json_data: Dict) -> List[Dict]:
     return processor.process()
 
 
-def convert_utc_to_cst(input_file):
-    """Convert timestamps from UTC to CST."""
-    with open(input_file, "r") as f:
-        data = json.load(f)
-
+def convert_utc_to_cst(data):
+    """Convert the timestamps of a list of notes from UTC to CST in place."""
     utc_tz = pytz.UTC
     cst_tz = pytz.timezone("America/Chicago")
 
@@ -180,78 +178,52 @@ def convert_utc_to_cst(input_file):
             except ValueError:
                 print(f"Error converting end time: {end_dt_str}")
 
-    output_file = input_file
-    with open(output_file, "w") as f:
-        json.dump(data, f, indent=4)
-
-    return output_file
-
-
-def process_directory(directory_path):
-    """Process all JSON files in a directory."""
-    directory = Path(directory_path)
-    processed_files = []
-
-    for file_path in directory.glob("*.json"):
-        try:
-            output_file = convert_utc_to_cst(file_path)
-            processed_files.append(output_file)
-            print(f"Processed: {file_path.name} -> {Path(output_file).name}")
-        except Exception as e:
-            print(f"Error processing {file_path.name}: {str(e)}")
-
-    return processed_files
+    return data
 
 
 def filter_json_by_date(data, target_date=None):
     if target_date is None:
-        cst = timezone("US/Central")
-        # ------------------------
-        # ------------------------
-        # ------------------------
-        # ------------------------
-        # ------------------------
-        # ------------------------
-        # ------------------------
-    # target_date = (datetime.now(cst).strftime("%Y-%m-%d"))
-    target_date = (datetime.now(cst) - timedelta(days=9)).strftime("%Y-%m-%d")
-
-# Validate target date format
-    try:
-        datetime.strptime(target_date, "%Y-%m-%d")
-    except ValueError:
-        raise ValueError("target_date must be in YYYY-MM-DD format")    
+        target_date = qa_dates.target_date()
+    validate_date(target_date)
     filtered_data = [item for item in data if item.get("date") == target_date]
     return filtered_data
 
 
-# Main execution
-if __name__ == "__main__":
-    # Step 1: Process raw JSON files
-    raw_dir = "data/notes/raw_notes/"
-    for filename in os.listdir(raw_dir):
-        with open(os.path.join(raw_dir, filename), "r") as f:
-            json_data = json.load(f)
-
-        output = process_json_data(json_data)
-        output_filename = f"data/notes/cleaned_notes/{filename}"
-        with open(output_filename, "w") as f:
-            json.dump(output, f, indent=4)
-
-    # Step 2: Convert timezones
-    cleaned_dir = "data/notes/cleaned_notes"
-    processed_files = process_directory(cleaned_dir)
+def clean_raw_notes(raw_dir="data/notes/raw_notes/",
+                    cleaned_dir="data/notes/cleaned_notes"):
+    """Extract the note fields of every raw board file and convert to CST."""
+    processed_files = []
+    for filename in store.listdir(raw_dir):
+        try:
+            json_data = store.load(os.path.join(raw_dir, filename))
+            output = convert_utc_to_cst(process_json_data(json_data))
+            store.save(os.path.join(cleaned_dir, filename), output)
+            processed_files.append(filename)
+            print(f"Processed: {filename}")
+        except Exception as e:
+            print(f"Error processing {filename}: {str(e)}")
+
     print(
         f"\nTotal files processed for timezone conversion: {len(processed_files)}"
     )
+    return processed_files
+
+
+def main():
+    # Step 1 and 2: Process raw JSON files and convert timezones
+    cleaned_dir = "data/notes/cleaned_notes"
+    clean_raw_notes(cleaned_dir=cleaned_dir)
 
     # Step 3: Filter by date
     filtered_dir = "data/notes/filtered_notes/"
-    for filename in os.listdir(cleaned_dir):
-        with open(os.path.join(cleaned_dir, filename), "r") as f:
-            data = json.load(f)
+    target_date = qa_dates.target_date()
+    print(f"Filtering notes for {target_date}")
+    for filename in store.listdir(cleaned_dir):
+        data = store.load(os.path.join(cleaned_dir, filename))
+        filtered_data = filter_json_by_date(data, target_date)
+        store.save(os.path.join(filtered_dir, filename), filtered_data)
 
-        filtered_data = filter_json_by_date(data)
 
-        with open(os.path.join(filtered_dir, filename), "w") as f:
-            json.dump(filtered_data, f, indent=4)
\ No newline at end of file
+# Main execution
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,15 @@
-import json
 import requests
 import os
 from dotenv import load_dotenv
 from pyairtable import Api, Table, api
 from datetime import datetime, timedelta
+from pipeline import store
 
 load_dotenv()
 
 # Initialize the Airtable API
 api = Api(os.getenv("AIRTABLE_API_KEY"))
 
-table = api.table("appYvU5Req8gKzr7A", "tblUjWsTBe299fVF9")
-
-# Get all the records from the Airtable
-table = table.all()
-
 
 def convert_json(data):
 
@@ -42,40 +37,29 @@ def convert_json(data):
     return converted_data
 
 
-converted_data = convert_json(table)
-# Load additional JSON data
-with open("data/reference/init.json", "r") as f:
-    boards = json.load(f)
+def main():
+    # Get all the records from the Airtable
+    table = api.table("appYvU5Req8gKzr7A", "tblUjWsTBe299fVF9").all()
+    converted_data = convert_json(table)
 
-with open("data/reference/phone_details.json", "w") as f:
+    boards = store.load("data/reference/init.json")
     for call in converted_data:
         for board in boards:
             if call["To"] == board["number"] or call["From"] == board["number"]:
                 call["Board_id"] = board["Board_id"]
                 call["Staff Member"] = board["Staff Member"]
-    json.dump(converted_data, f, indent=4)
-
-
-
-# Load the first JSON file
-with open("data/reference/init.json", "r") as f:
-    first_data = json.load(f)
-
-# Load the second JSON file
-with open("data/reference/phone_details.json", "r") as f:
-    second_data = json.load(f)
 
-# Create a mapping from "number" to "id"
-number_to_id = {item["number"]: item["id"] for item in first_data}
+    # Create a mapping from "number" to "id"
+    number_to_id = {item["number"]: item["id"] for item in boards}
 
-# Iterate through each item in the second JSON and add "id" if "To" matches
-for item in second_data:
-    to_number = item.get("To", "")
-    if to_number in number_to_id:
-        item["id"] = number_to_id[to_number]
+    # Add "id" to every call whose "To" matches
+    for item in converted_data:
+        to_number = item.get("To", "")
+        if to_number in number_to_id:
+            item["id"] = number_to_id[to_number]
 
-# Save the modified second JSON to a new file
-with open("data/reference/phone_details.json", "w") as f:
-    json.dump(second_data, f, indent=4)
+    store.save("data/reference/phone_details.json", converted_data)
 
 
+if __name__ == "__main__":
+    main()
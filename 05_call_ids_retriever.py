@@ -1,7 +1,7 @@
 import requests
 from dotenv import load_dotenv
 import os
-import json
+from pipeline import store
 
 load_dotenv()
 
@@ -15,24 +15,22 @@ headers = {
 
 dir = "data/reference/phone_details.json"
 
-with open(dir, "r") as f:
-    phone_details = json.load(f)
-for filename, item in enumerate(phone_details):
-    if len(item) == 9:
-        if item["Direction"] == "incoming":
-            params = {
-                "phoneNumberId": item["id"],
-                "participants": item["From"],
-            }
-            response = requests.get("https://api.openphone.com/v1/calls", params=params, headers=headers).json()
 
-            with open(f"data/call_logs/{filename}.json", "w") as f:
-                f.write(json.dumps(response, indent=2))
+def main():
+    phone_details = store.load(dir)
+    for filename, item in enumerate(phone_details):
+        if len(item) == 9:
+            if item["Direction"] == "incoming":
+                params = {
+                    "phoneNumberId": item["id"],
+                    "participants": item["From"],
+                }
+                response = requests.get("https://api.openphone.com/v1/calls", params=params, headers=headers).json()
 
+                store.save(f"data/call_logs/{filename}.json", response, indent=2)
 
+    store.save(dir, phone_details)
 
 
-
-with open(dir, "w") as f:
-    f.write(json.dumps(phone_details, indent=4))
-
+if __name__ == "__main__":
+    main()
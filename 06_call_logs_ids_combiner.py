@@ -0,0 +1,178 @@
+import os
+from datetime import datetime
+from typing import List, Dict, Any
+from dateutil.parser import parse
+import pytz
+import qa_dates
+from pipeline import store
+from qa_dates import validate_date
+
+
+def process_json_files(main_json_path, call_logs_dir):
+    # Read main JSON file
+    main_data = store.load(main_json_path)
+
+    # Process each entry in main JSON
+    for index, main_entry in enumerate(main_data):
+        json_file_path = os.path.join(call_logs_dir, f"{index}.json")
+
+        # Check if corresponding JSON file exists
+        if not store.exists(json_file_path):
+            continue
+
+        # Read the corresponding JSON file
+        index_data = store.load(json_file_path)
+
+        # Get main entry start time
+        main_start_time = main_entry.get("Start Time")
+
+        # Look through each item in the index file's data
+        for item in index_data.get("data", []):
+            # Get created time from index file
+            created_at = item.get("createdAt")
+
+            # Compare timestamps
+            if main_start_time == created_at:
+                # If times match, add the phoneNumberId to main entry
+                main_entry["callid"] = item.get("id")
+                break
+
+    return main_data
+
+
+def filter_items(data):
+    """Filters items in the JSON data based on length."""
+    filtered_items = []
+    for item in data:
+        if len(item) == 10:
+            filtered_items.append(item)
+    return filtered_items
+
+
+# Define CST timezone
+cst = pytz.timezone("America/Chicago")
+
+
+# Function to determine the original datetime format
+def get_datetime_format(datetime_str):
+    if "T" in datetime_str and datetime_str.endswith("Z"):
+        if "." in datetime_str:
+            return "%Y-%m-%dT%H:%M:%S.%fZ"
+        else:
+            return "%Y-%m-%dT%H:%M:%S.Z"
+    elif (
+        datetime_str.startswith(("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"))
+        and "+0000" in datetime_str
+    ):
+        return "%a, %d %b %Y %H:%M:%S %z"
+    else:
+        raise ValueError(f"Unknown datetime format: {datetime_str}")
+
+
+def convert_calls_to_cst(data):
+    """Convert the Start and End Time of every call from UTC to CST."""
+    # Iterate through each item and convert times
+    for item in data:
+        # Parse the UTC times
+        start_time_str = item["Start Time"]
+        end_time_str = item["End Time"]
+
+        # Determine the format
+        start_fmt = get_datetime_format(start_time_str)
+        end_fmt = get_datetime_format(end_time_str)
+
+        # Parse the datetime strings
+        start_time_utc = parse(start_time_str)
+        end_time_utc = parse(end_time_str)
+
+        # Convert to CST
+        start_time_cst = start_time_utc.astimezone(cst)
+        end_time_cst = end_time_utc.astimezone(cst)
+
+        # Format back to the original format
+        if start_fmt == "%Y-%m-%dT%H:%M:%S.%fZ":
+            start_time_cst_str = start_time_cst.strftime("%Y-%m-%dT%H:%M:%S.%f")[
+                :-3
+            ] + start_time_cst.strftime("%z")
+            start_time_cst_str = start_time_cst_str[:-2] + ":" + start_time_cst_str[-2:]
+        elif start_fmt == "%Y-%m-%dT%H:%M:%S.Z":
+            start_time_cst_str = start_time_cst.strftime("%Y-%m-%dT%H:%M:%S%z")
+            start_time_cst_str = start_time_cst_str[:-2] + ":" + start_time_cst_str[-2:]
+        elif start_fmt == "%a, %d %b %Y %H:%M:%S %z":
+            start_time_cst_str = start_time_cst.strftime("%a, %d %b %Y %H:%M:%S %z")
+        else:
+            raise ValueError(f"Unknown format: {start_fmt}")
+
+        if end_fmt == "%Y-%m-%dT%H:%M:%S.%fZ":
+            end_time_cst_str = end_time_cst.strftime("%Y-%m-%dT%H:%M:%S.%f")[
+                :-3
+            ] + end_time_cst.strftime("%z")
+            end_time_cst_str = end_time_cst_str[:-2] + ":" + end_time_cst_str[-2:]
+        elif end_fmt == "%Y-%m-%dT%H:%M:%S.Z":
+            end_time_cst_str = end_time_cst.strftime("%Y-%m-%dT%H:%M:%S%z")
+            end_time_cst_str = end_time_cst_str[:-2] + ":" + end_time_cst_str[-2:]
+        elif end_fmt == "%a, %d %b %Y %H:%M:%S %z":
+            end_time_cst_str = end_time_cst.strftime("%a, %d %b %Y %H:%M:%S %z")
+        else:
+            raise ValueError(f"Unknown format: {end_fmt}")
+
+        # Update the item with CST times
+        item["Start Time"] = start_time_cst_str
+        item["End Time"] = end_time_cst_str
+
+    return data
+
+
+# ---------------------
+# filter_json_by_date
+
+# def filter_json_by_date(data: List[Dict[Any, Any]], target_date: str = None) -> List[Dict[Any, Any]]:
+
+
+def filter_json_by_date(data, target_date=None):
+
+    # Use the configured QA day in CST if no target date provided
+    if target_date is None:
+        target_date = qa_dates.target_date()
+    validate_date(target_date)
+    return [item for item in data if call_date(item) == target_date]
+
+
+def call_date(item):
+    """Return the CST day a call started on, or None if it has no valid time."""
+    start_time_str = item.get("Start Time")
+    if not start_time_str:
+        # Skip items without "Start Time" key
+        return None
+    try:
+        # Parse the Start Time string
+        start_time = datetime.strptime(start_time_str, "%Y-%m-%dT%H:%M:%S.%f%z")
+    except ValueError:
+        # Skip items with invalid date formats
+        return None
+    # Extract the date part
+    return start_time.strftime("%Y-%m-%d")
+
+
+def prepare_call_details(
+    phone_details_path="data/reference/phone_details.json", call_logs_dir="data/call_logs"
+):
+    """Attach call ids, keep matched calls and convert their times to CST."""
+    data = process_json_files(phone_details_path, call_logs_dir)
+    data = convert_calls_to_cst(filter_items(data))
+    store.save(phone_details_path, data)
+    return data
+
+
+def main():
+    data = prepare_call_details()
+
+    # Filter the data
+    filtered_data = filter_json_by_date(data)
+
+    # Write the filtered data to a new JSON file
+    store.save("data/reference/phone_details.json", filtered_data)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,13 @@
-import json
+from pipeline import store
 
 
 def process_calls(input_file, staff_file):
     # Load staff data
-    with open(staff_file, "r") as f:
-        staff_data = json.load(f)
+    staff_data = store.load(staff_file)
     staff_numbers = {person["number"] for person in staff_data}
 
     # Load calls data
-    with open(input_file, "r") as f:
-        calls = json.load(f)
+    calls = store.load(input_file)
 
     # Process each call
     for call in calls:
@@ -35,13 +33,16 @@ def process_calls(input_file, staff_file):
             call["call_transcript"] = formatted_transcript
 
     # Save processed calls
-    with open("data/reference/phone_details.json", "w") as f:
-        json.dump(calls, f, indent=2)
+    store.save("data/reference/phone_details.json", calls, indent=2)
 
     return calls
 
 
-# Example usage
-input_file = "data/reference/phone_details.json"
-staff_file = "data/reference/init.json"
-processed_data = process_calls(input_file, staff_file)
+def main():
+    input_file = "data/reference/phone_details.json"
+    staff_file = "data/reference/init.json"
+    process_calls(input_file, staff_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,12 @@
 import json
 import os
 from collections import defaultdict
+from pipeline import store
 
 
 def process_json_files(main_json_path, notes_dir):
     # Read main JSON file
-    with open(main_json_path, "r") as f:
-        main_data = json.load(f)
+    main_data = store.load(main_json_path)
 
     # Group items by Board_id
     board_id_groups = defaultdict(list)
@@ -15,14 +15,13 @@ def process_json_files(main_json_path, notes_dir):
             board_id_groups[item["Board_id"]].append(item)
 
     # Process each file in notes directory
-    for filename in os.listdir(notes_dir):
+    for filename in store.listdir(notes_dir):
         if filename.endswith(".json"):
             board_id = filename[:-5]  # Remove .json extension
             file_path = os.path.join(notes_dir, filename)
             try:
                 # Read existing notes file
-                with open(file_path, "r") as f:
-                    existing_data = json.load(f)
+                existing_data = store.load(file_path)
 
                 # Extract the actual notes array, regardless of nesting
                 notes_array = None
@@ -49,8 +48,7 @@ def process_json_files(main_json_path, notes_dir):
                 }
 
                 # Write updated data back to file
-                with open(file_path, "w") as f:
-                    json.dump(output_data, f, indent=2)
+                store.save(file_path, output_data, indent=2)
                 print(f"Processed {filename}")
             except json.JSONDecodeError:
                 print(f"Error: Invalid JSON in {filename}")
@@ -58,7 +56,11 @@ def process_json_files(main_json_path, notes_dir):
                 print(f"Error processing {filename}: {str(e)}")
 
 
-# Usage
-main_json_path = "data/reference/phone_details.json"  # Path to your main JSON file
-notes_dir = "data/notes/filtered_notes"  # Path to directory containing note files
-process_json_files(main_json_path, notes_dir)
+def main():
+    main_json_path = "data/reference/phone_details.json"  # Path to your main JSON file
+    notes_dir = "data/notes/filtered_notes"  # Path to directory containing note files
+    process_json_files(main_json_path, notes_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,40 @@ from openai import OpenAI
 import json
 import os
 from dotenv import load_dotenv
-from datetime import datetime
-import time
+from pipeline import store
+from qa_calls import CALL_WINDOW_MINUTES, attach_calls
+from qa_ai import (
+    EMPTY_BOARD,
+    analyze_changed_notes,
+    analyze_files,
+    create_completion,
+    merge_note_fields,
+    note_index,
+    prompt_stats,
+    render_notes,
+)
 
 load_dotenv()
 OPEN_AI_API = os.getenv("OPEN_AI_API")
 
 client = OpenAI(api_key=OPEN_AI_API)
 
+# The note fields this check reads; edits to other fields keep the stored verdict
+NOTE_FIELDS = [
+    "date",
+    "start_time",
+    "end_time",
+    "service_type",
+    "provided_as",
+    "update_text_body",
+    "call_transcripts",
+]
+
 
 def analyze_issue(description):
-    response = client.chat.completions.create(
-        model="gpt-4o-2024-11-20",
+    response = create_completion(
+        client,
+        stage="transcript",
         messages=[{"role": "user", "content": f"{description}"}],
         functions=[
             {
@@ -48,28 +70,9 @@ def analyze_issue(description):
     return result
 
 
-# Specify the folder containing the JSON files
-input_folder = "data/notes/filtered_notes/"
-output_folder = "AI Revised 1"
-
-# Create the output folder if it doesn't exist
-if not os.path.exists(output_folder):
-    os.makedirs(output_folder)
-
-# Get list of all JSON files in the input folder
-json_files = [f for f in os.listdir(input_folder) if f.endswith(".json")]
-
-# Process each JSON file
-for filename in json_files:
-    file_path = os.path.join(input_folder, filename)
-
-    # Load data from the JSON file
-    with open(file_path, "r") as f:
-        data = json.load(f)
-
-    # Prepare the description
-    description = f"""
-    You are given session notes and corresponding call details and transcripts recorded by the Housing Coordinator. Your task is to analyze each note in the provided session notes and determine if there is a corresponding call session within 60 minutes of the start and end times of the note. Also, check if a transcript exists for the call.
+def build_description(data):
+    return f"""
+    You are given session notes and corresponding call details and transcripts recorded by the Housing Coordinator. Your task is to analyze each note in the provided session notes and determine if there is a corresponding call session within {CALL_WINDOW_MINUTES} minutes of the start and end times of the note. Also, check if a transcript exists for the call.
 
     Follow these steps for each note:
 
@@ -104,8 +107,8 @@ for filename in json_files:
 
     Make sure to evaluate each note thoroughly, providing a severity level and an explanatory reason for every single note.
     Make sure that the reasoning is clear and and fully detailed around 3 lines or more.
-    **Session Notes**: {data['notes']}
-    **Call Transcripts**: {data['call_transcripts']}
+    **Session Notes**: {render_notes(data['notes'], NOTE_FIELDS)}
+    **Call Transcripts**: each note lists under "call_transcripts" the calls that started or ended within {CALL_WINDOW_MINUTES} minutes of it. Compare a note only with its own calls; a note with none has no call record.
 
     Make sure the structure of the response is as follows in this example:
     "notes_analysis": [
@@ -117,20 +120,61 @@ for filename in json_files:
         ]
     """
 
-    # Perform analysis
+
+def analyze_notes(data):
+    """Return the transcript verdict of the notes of a bundle by note index."""
+    description = build_description(data)
+    prompt_stats.record("transcript", description)
     analysis = analyze_issue(description)
+    fields = {}
+    for note_analysis in analysis["notes_analysis"]:
+        index = note_index(note_analysis, len(data["notes"]))
+        if index is not None:
+            fields[index] = {
+                "transcript_severity": note_analysis["severity"],
+                "transcript_reason": note_analysis["reason"],
+            }
+    return fields
+
+
+def analyze_board(data):
+    """Return the transcript verdict of every note by note index.
+
+    Notes whose analyzed fields did not change reuse their stored verdict.
+    """
+    # Each note only carries the calls near it into the prompt
+    return analyze_changed_notes(
+        "transcript",
+        attach_calls(data),
+        NOTE_FIELDS,
+        analyze_notes,
+        prompt=build_description(EMPTY_BOARD),
+    )
+
+
+def process_files(input_folder, output_folder):
+    # Get list of all JSON files in the input folder
+    json_files = [f for f in store.listdir(input_folder) if f.endswith(".json")]
+
+    # Analyze all the files at once, then save them in order
+    futures = analyze_files(analyze_board, input_folder, json_files)
+    for filename, future in zip(json_files, futures):
+        # Update the data with the analysis results
+        data, fields = future.result()
+        merge_note_fields(data, fields)
+
+        # Construct output file path
+        output_file_path = os.path.join(output_folder, filename)
+
+        # Save the updated data to a new JSON file
+        store.save(output_file_path, data, indent=2)
+
+        print(f"Processed {filename} and saved to {output_file_path}")
 
-    # Update the data with analysis results
-    for i, note_analysis in enumerate(analysis["notes_analysis"]):
-        data["notes"][i]["transcript_severity"] = note_analysis["severity"]
-        data["notes"][i]["transcript_reason"] = note_analysis["reason"]
 
-    # Construct output file path
-    output_file_path = os.path.join(output_folder, filename)
+def main():
+    process_files("data/notes/filtered_notes/", "AI Revised 1")
 
-    # Save the updated data to a new JSON file
-    with open(output_file_path, "w") as f:
-        json.dump(data, f, indent=2)
-        time.sleep(2)
 
-    print(f"Processed {filename} and saved to {output_file_path}")
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,32 @@ from openai import OpenAI
 import json
 import os
 from dotenv import load_dotenv
-from datetime import datetime
+from pipeline import store
+from qa_ai import (
+    EMPTY_BOARD,
+    analyze_changed_notes,
+    analyze_files,
+    create_completion,
+    merge_note_fields,
+    note_index,
+    prompt_stats,
+    render_notes,
+)
 
 load_dotenv()
 OPEN_AI_API = os.getenv("OPEN_AI_API")
 
 client = OpenAI(api_key=OPEN_AI_API)
 
+# The note fields this check reads; edits to other fields keep the stored verdict
+NOTE_FIELDS = ["service_type", "service_line", "update_text_body"]
 
-def analyze_issue(description):
-    response = client.chat.completions.create(
-        model="gpt-4o-2024-11-20",
-        messages=[{"role": "user", "content": f"{description}"}],
+
+def analyze_issue(messages):
+    response = create_completion(
+        client,
+        stage="service",
+        messages=messages,
         functions=[
             {
                 "name": "service_analysis",
@@ -47,27 +61,8 @@ def analyze_issue(description):
     return result
 
 
-# Specify the folder containing the JSON files
-input_folder = "AI Revised 3"
-output_folder = "AI Revised 4"
-
-# Create the output folder if it doesn't exist
-if not os.path.exists(output_folder):
-    os.makedirs(output_folder)
-
-# Get list of all JSON files in the input folder
-json_files = [f for f in os.listdir(input_folder) if f.endswith(".json")]
-
-# Process each JSON file
-for filename in json_files:
-    file_path = os.path.join(input_folder, filename)
-
-    # Load data from the JSON file
-    with open(file_path, "r") as f:
-        data = json.load(f)
-
-    # Prepare the description
-    description = f"""
+# The static part of the prompt, sent first so OpenAI can cache it
+INSTRUCTIONS = """
     You are a Session Notes Service Line and Service Type Analyzer.
     Your goal is to analyze session notes and verify whether the added service line and type match the note. If the note and service line and service type do not match, mark the note as 'Flagged' and output a concise and clear reason for it.  Provide an index for each note, starting from zero.
     If the note matches the service line and service type, mark the note as 'Good'. Provide an index for each note, starting from zero.
@@ -137,7 +132,6 @@ for filename in json_files:
     - If either the service line or service type does not exist or is not added, mark the note as 'Flagged'
     - Go through each and make sure the reponses are in structured format.
 
-    **Session Notes**: {data['notes']}
 
     Key for analyzing the parts of JSON:
     Note Session: "update_text_body",
@@ -164,36 +158,93 @@ for filename in json_files:
     "index": 1,
     "label": "Flagged",
     "reason": "The note indicates helping the person meet and build a relationship with a prospective landlord, but the added service line is Housing Sustaining. The note should be marked as Flagged, due to the mismatch between the added service line and servie type. The service type should be updated to Housing Transition.""
-    
+
     Flagged Example:
     Note Session: "We had a staff meeting to discuss housing options for the client.",
     Service Line: "Assisting the person with the housing search and application process",
     Service Type: "Housing Transition",
-    
+
     Make sure the structure of the response is as follows in this example:
     "notes_analysis": [
-        {{
+        {
             "note_index": 0,
             "severity": "Flagged",
             "reason": "The note indicates helping the person meet and build a relationship with a prospective landlord, but the added service line is Housing Sustaining. The note should be marked as Flagged, due to the mismatch between the added service line and servie type. The service type should be updated to Housing Transition."
-        }}
+        }
+    ]
+    """
+
+
+def build_description(data):
+    return f"""{INSTRUCTIONS}
+    **Session Notes**: {render_notes(data['notes'], NOTE_FIELDS)}
+    """
+
+
+def build_messages(data):
+    """The instructions as a system prefix that is the same on every call, then the notes."""
+    return [
+        {"role": "system", "content": INSTRUCTIONS},
+        {
+            "role": "user",
+            "content": f"**Session Notes**: {render_notes(data['notes'], NOTE_FIELDS)}",
+        },
     ]
+
+
+def analyze_notes(data):
+    """Return the service line/type verdict of the notes of a bundle by note index."""
+    messages = build_messages(data)
+    prompt_stats.record("service", messages)
+    analysis = analyze_issue(messages)
+    fields = {}
+    for note_analysis in analysis["notes_analysis"]:
+        index = note_index(note_analysis, len(data["notes"]))
+        if index is not None:
+            fields[index] = {
+                "service_severity": note_analysis["severity"],
+                "service_reason": note_analysis["reason"],
+            }
+    return fields
+
+
+def analyze_board(data):
+    """Return the service line/type verdict of every note by note index.
+
+    Notes whose analyzed fields did not change reuse their stored verdict.
     """
+    return analyze_changed_notes(
+        "service",
+        data,
+        NOTE_FIELDS,
+        analyze_notes,
+        prompt=build_description(EMPTY_BOARD),
+    )
+
+
+def process_files(input_folder, output_folder):
+    # Get list of all JSON files in the input folder
+    json_files = [f for f in store.listdir(input_folder) if f.endswith(".json")]
+
+    # Analyze all the files at once, then save them in order
+    futures = analyze_files(analyze_board, input_folder, json_files)
+    for filename, future in zip(json_files, futures):
+        # Update the data with the analysis results
+        data, fields = future.result()
+        merge_note_fields(data, fields)
+
+        # Construct output file path
+        output_file_path = os.path.join(output_folder, filename)
 
+        # Save the updated data to a new JSON file
+        store.save(output_file_path, data, indent=2)
 
-    # Perform analysis
-    analysis = analyze_issue(description)
+        print(f"Processed {filename} and saved to {output_file_path}")
 
-    # Update the data with analysis results
-    for i, note_analysis in enumerate(analysis["notes_analysis"]):
-        data["notes"][i]["service_severity"] = note_analysis["severity"]
-        data["notes"][i]["service_reason"] = note_analysis["reason"]
 
-    # Construct output file path
-    output_file_path = os.path.join(output_folder, filename)
+def main():
+    process_files("AI Revised 3", "AI Revised 4")
 
-    # Save the updated data to a new JSON file
-    with open(output_file_path, "w") as f:
-        json.dump(data, f, indent=2)
 
-    print(f"Processed {filename} and saved to {output_file_path}")
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,33 @@ from openai import OpenAI
 import json
 import os
 from dotenv import load_dotenv
-from datetime import datetime
+from pipeline import store
+import qa_rules
+from qa_ai import (
+    EMPTY_BOARD,
+    analyze_changed_notes,
+    analyze_files,
+    create_completion,
+    merge_note_fields,
+    note_index,
+    prompt_stats,
+    render_notes,
+)
 
 load_dotenv()
 OPEN_AI_API = os.getenv("OPEN_AI_API")
 
 client = OpenAI(api_key=OPEN_AI_API)
 
+# The note fields this check reads; edits to other fields keep the stored verdict
+NOTE_FIELDS = [key for key, _ in qa_rules.REQUIRED_COLUMNS]
 
-def analyze_issue(description):
-    response = client.chat.completions.create(
-        model="gpt-4o-2024-11-20",
-        messages=[{"role": "user", "content": f"{description}"}],
+
+def analyze_issue(messages):
+    response = create_completion(
+        client,
+        stage="columns",
+        messages=messages,
         functions=[
             {
                 "name": "columns_analysis",
@@ -47,27 +62,8 @@ def analyze_issue(description):
     return result
 
 
-# Specify the folder containing the JSON files
-input_folder = "AI Revised 5"
-output_folder = "AI Revised 6"
-
-# Create the output folder if it doesn't exist
-if not os.path.exists(output_folder):
-    os.makedirs(output_folder)
-
-# Get list of all JSON files in the input folder
-json_files = [f for f in os.listdir(input_folder) if f.endswith(".json")]
-
-# Process each JSON file
-for filename in json_files:
-    file_path = os.path.join(input_folder, filename)
-
-    # Load data from the JSON file
-    with open(file_path, "r") as f:
-        data = json.load(f)
-
-    # Prepare the description
-    description = f"""
+# The static part of the prompt, sent first so OpenAI can cache it
+INSTRUCTIONS = """
     You are Columns Checker and you verify whether all the required columns are filled by the staff member or not.
     If even one column is not filled, mark the note as 'Flagged' and output a concise and clear reason for it.  Provide an index for each note, starting from zero.
     If the note contains all the required columns, mark the note as 'Good'. Provide an index for each note, starting from zero.
@@ -81,13 +77,12 @@ for filename in json_files:
     Service Line: "service_line"
     Session Status: "session_status"
     If any of the above values is null or not exists, mark the note as 'Flagged' and output a concise and clear reason for it. Also mark it Flagged, if the Session status is either in-progress or not added. If all the column values exists, mark the note as 'Good'. For each note, provide an index starting from zero. Don't verify other values else then those that are mentioned above.
-    
+
 
     The AI should output one of the following labels for each note:
     - Index, Good, reason,
     - Index, Flagged, reason
 
-    **Session Notes**: {data['notes']}
 
     Examples:
 
@@ -158,27 +153,87 @@ for filename in json_files:
 
     Make sure the structure of the response is as follows in this example:
     "notes_analysis": [
-        {{
+        {
             "note_index": 0,
             "severity": "Good",
             "reason": "All the columns are filled, therefore the note is marked as good"
-        }}
+        }
+    ]
+    """
+
+
+def build_description(data):
+    return f"""{INSTRUCTIONS}
+    **Session Notes**: {render_notes(data['notes'], NOTE_FIELDS)}
+    """
+
+
+def build_messages(data):
+    """The instructions as a system prefix that is the same on every call, then the notes."""
+    return [
+        {"role": "system", "content": INSTRUCTIONS},
+        {
+            "role": "user",
+            "content": f"**Session Notes**: {render_notes(data['notes'], NOTE_FIELDS)}",
+        },
     ]
+
+
+def analyze_notes(data):
+    """Return the required-columns verdict of the notes of a bundle by note index."""
+    messages = build_messages(data)
+    prompt_stats.record("columns", messages)
+    analysis = analyze_issue(messages)
+    fields = {}
+    for note_analysis in analysis["notes_analysis"]:
+        index = note_index(note_analysis, len(data["notes"]))
+        if index is not None:
+            fields[index] = {
+                "columns_severity": note_analysis["severity"],
+                "columns_reason": note_analysis["reason"],
+            }
+    return fields
+
+
+def analyze_board(data):
+    """Return the required-columns verdict of every note by note index.
+
+    Notes whose analyzed fields did not change reuse their stored verdict.
     """
+    if qa_rules.RULE_CHECKS:
+        return qa_rules.rule_fields(data["notes"], ["columns"])
+    return analyze_changed_notes(
+        "columns",
+        data,
+        NOTE_FIELDS,
+        analyze_notes,
+        prompt=build_description(EMPTY_BOARD),
+    )
+
+
+def process_files(input_folder, output_folder):
+    # Get list of all JSON files in the input folder
+    json_files = [f for f in store.listdir(input_folder) if f.endswith(".json")]
+
+    # Analyze all the files at once, then save them in order
+    futures = analyze_files(analyze_board, input_folder, json_files)
+    for filename, future in zip(json_files, futures):
+        # Update the data with the analysis results
+        data, fields = future.result()
+        merge_note_fields(data, fields)
+
+        # Construct output file path
+        output_file_path = os.path.join(output_folder, filename)
+
+        # Save the updated data to a new JSON file
+        store.save(output_file_path, data, indent=2)
 
-    # Perform analysis
-    analysis = analyze_issue(description)
+        print(f"Processed {filename} and saved to {output_file_path}")
 
-    # Update the data with analysis results
-    for i, note_analysis in enumerate(analysis["notes_analysis"]):
-        data["notes"][i]["columns_severity"] = note_analysis["severity"]
-        data["notes"][i]["columns_reason"] = note_analysis["reason"]
 
-    # Construct output file path
-    output_file_path = os.path.join(output_folder, filename)
+def main():
+    process_files("AI Revised 5", "AI Revised 6")
 
-    # Save the updated data to a new JSON file
-    with open(output_file_path, "w") as f:
-        json.dump(data, f, indent=2)
 
-    print(f"Processed {filename} and saved to {output_file_path}")
+if __name__ == "__main__":
+    main()
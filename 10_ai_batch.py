@@ -0,0 +1,175 @@
+from openai import OpenAI
+import json
+import os
+import time
+from dotenv import load_dotenv
+from pipeline import AI_PASS_SCRIPTS, FILTERED_NOTES, load_stage, store
+from qa_ai import (
+    LLM_CACHE_MODE,
+    BatchRequestQueued,
+    batch_collector,
+    digest,
+    response_cache,
+)
+
+load_dotenv()
+OPEN_AI_API = os.getenv("OPEN_AI_API")
+
+client = OpenAI(api_key=OPEN_AI_API)
+
+# Seconds between checks on a submitted batch
+BATCH_POLL_SECONDS = int(os.getenv("QA_BATCH_POLL_SECONDS", "60"))
+# Batches sent one after another for the requests that only exist once earlier
+# ones are answered, like billing rewrites and cascade escalations
+BATCH_ROUNDS = int(os.getenv("QA_BATCH_ROUNDS", "3"))
+BATCH_DIR = "data/batches"
+BATCH_ENDPOINT = "/v1/chat/completions"
+FINISHED = ("completed", "failed", "expired", "cancelled")
+
+
+def collect_requests(bundles):
+    """Run the six passes on every bundle, queueing the requests they would send.
+
+    Requests already in the response cache or with a stored verdict are
+    answered locally and never queued.
+    """
+    passes = {script: load_stage(script) for script in AI_PASS_SCRIPTS}
+    batch_collector.requests.clear()
+    batch_collector.collecting = True
+    try:
+        for filename, data in bundles.items():
+            for script, module in passes.items():
+                try:
+                    module.analyze_board(data)
+                except BatchRequestQueued:
+                    pass
+                except Exception as e:
+                    print(f"Error in {script} for {filename}: {str(e)}")
+    finally:
+        batch_collector.collecting = False
+    return dict(batch_collector.requests)
+
+
+def submit_batch(requests):
+    """Upload the requests as a JSONL batch file and start the batch.
+
+    The batch id is kept next to the file, so a rerun over the same requests
+    waits for the running batch instead of submitting it again.
+    """
+    batch_key = digest(sorted(requests))
+    state_path = os.path.join(BATCH_DIR, f"{batch_key}.json")
+    input_path = os.path.join(BATCH_DIR, f"{batch_key}.jsonl")
+    if os.path.exists(state_path):
+        with open(state_path, "r") as f:
+            batch_id = json.load(f)["batch_id"]
+        print(f"Resuming batch {batch_id}")
+        return batch_id, state_path, input_path
+
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    with open(input_path, "w") as f:
+        for key, request in requests.items():
+            line = {"custom_id": key, "method": "POST", "url": BATCH_ENDPOINT, "body": request}
+            f.write(json.dumps(line) + "\n")
+
+    with open(input_path, "rb") as f:
+        batch_file = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h",
+    )
+    with open(state_path, "w") as f:
+        json.dump({"batch_id": batch.id, "requests": len(requests)}, f)
+    print(f"Submitted batch {batch.id} with {len(requests)} requests")
+    return batch.id, state_path, input_path
+
+
+def wait_for_batch(batch_id):
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in FINISHED:
+            return batch
+        counts = batch.request_counts
+        progress = f"{counts.completed}/{counts.total} done" if counts else "queued"
+        print(f"Batch {batch_id} is {batch.status}: {progress}")
+        time.sleep(BATCH_POLL_SECONDS)
+
+
+def read_results(batch):
+    """The completions of a finished batch by custom_id, as JSON strings."""
+    results = {}
+    if not batch.output_file_id:
+        return results
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        response = entry.get("response") or {}
+        if response.get("status_code") == 200:
+            results[entry["custom_id"]] = json.dumps(response["body"])
+    return results
+
+
+def run_batch(requests):
+    """Send the requests through the Batch API and hand their completions back."""
+    batch_id, state_path, input_path = submit_batch(requests)
+    batch = wait_for_batch(batch_id)
+    results = read_results(batch)
+    print(f"Batch {batch_id} {batch.status}: {len(results)} of {len(requests)} completions")
+
+    with batch_collector.lock:
+        batch_collector.results.update(results)
+    if LLM_CACHE_MODE != "off":
+        for key, response in results.items():
+            response_cache.put(key, response)
+    for path in (state_path, input_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    missing = len(requests) - len(results)
+    if missing:
+        print(f"{missing} requests failed in the batch; sending them synchronously")
+
+
+def process_files(input_folder, output_folders):
+    """Run the six QA passes of every bundle through OpenAI batches.
+
+    The passes are first run without sending anything to collect their
+    requests. Once the batch finishes they are collected again: requests
+    that depend on its answers, like the rewrites of overbilled notes or the
+    notes a cascade escalates, go out in the next batch, for up to
+    QA_BATCH_ROUNDS batches. The passes then run as in parallel mode and are
+    answered from the batches' completions.
+    """
+    json_files = [f for f in store.listdir(input_folder) if f.endswith(".json")]
+    bundles = {f: store.load(os.path.join(input_folder, f)) for f in json_files}
+
+    submitted = set()
+    for round_number in range(1, BATCH_ROUNDS + 1):
+        requests = {
+            key: request
+            for key, request in collect_requests(bundles).items()
+            if key not in submitted
+        }
+        if not requests:
+            break
+        print(f"Batch round {round_number}: {len(requests)} requests")
+        run_batch(requests)
+        submitted.update(requests)
+    if not submitted:
+        print("No requests to batch")
+
+    try:
+        load_stage("10_ai_parallel.py").process_files(input_folder, output_folders)
+    finally:
+        with batch_collector.lock:
+            batch_collector.results.clear()
+
+
+def main():
+    # 12_2 reads the units from AI Revised 2, 11 the verdicts from AI Revised 6
+    process_files(FILTERED_NOTES, ["AI Revised 2", "AI Revised 6"])
+
+
+if __name__ == "__main__":
+    main()
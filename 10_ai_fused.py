@@ -0,0 +1,177 @@
+from openai import OpenAI
+import json
+import os
+from dotenv import load_dotenv
+from pipeline import FILTERED_NOTES, load_stage, store
+import qa_rules
+from qa_calls import attach_calls
+from qa_ai import (
+    EMPTY_BOARD,
+    analyze_changed_notes,
+    analyze_files,
+    create_completion,
+    merge_note_fields,
+    note_index,
+    prompt_stats,
+    render_notes,
+)
+
+load_dotenv()
+OPEN_AI_API = os.getenv("OPEN_AI_API")
+
+client = OpenAI(api_key=OPEN_AI_API)
+
+# The checks of the six passes, with the fields each one fills
+CHECKS = [
+    ("10_ai_1_transcript_analyzer.py", "Call transcripts", "transcript"),
+    ("10_ai_2_start.py", "Start time", "start"),
+    ("10_ai_3_end.py", "End time", "end"),
+    ("10_ai_4_service.py", "Service line and type", "service"),
+    ("10_ai_5_bills.py", "Billing", "billing"),
+    ("10_ai_6_columns.py", "Required columns", "columns"),
+]
+
+# Stands in for the notes inside each check's instructions
+PLACEHOLDER = {"notes": "(the Session Notes at the end of this message)"}
+
+
+def llm_checks():
+    """The checks left to the model; the rule engine answers the others."""
+    if not qa_rules.RULE_CHECKS:
+        return CHECKS
+    return [check for check in CHECKS if check[2] not in qa_rules.RULE_PREFIXES]
+
+
+def verdict_properties():
+    properties = {"note_index": {"type": "integer"}}
+    for _, _, prefix in llm_checks():
+        properties[f"{prefix}_severity"] = {
+            "type": "string",
+            "enum": ["overbilled", "good"] if prefix == "billing" else ["Good", "Flagged"],
+        }
+        properties[f"{prefix}_reason"] = {"type": "string"}
+    properties["billing_improved"] = {
+        "type": "string",
+        "description": "Improved version of the note or 'not required' if good",
+    }
+    return properties
+
+
+def analyze_issue(description):
+    properties = verdict_properties()
+    response = create_completion(
+        client,
+        stage="fused",
+        messages=[{"role": "user", "content": f"{description}"}],
+        functions=[
+            {
+                "name": "issue_analysis",
+                "description": "Analyze every note with all six QA checks at once",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "notes_analysis": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": properties,
+                                "required": list(properties),
+                            },
+                        },
+                    },
+                    "required": ["notes_analysis"],
+                },
+            }
+        ],
+        function_call={"name": "issue_analysis"},
+    )
+    result = json.loads(response.choices[0].message.function_call.arguments)
+    return result
+
+
+def build_description(data):
+    """One prompt with the instructions of all six checks and the data once."""
+    sections = []
+    checks = llm_checks()
+    for number, (script, title, prefix) in enumerate(checks, 1):
+        instructions = load_stage(script).build_description(PLACEHOLDER).strip()
+        fields = f"{prefix}_severity, {prefix}_reason"
+        if prefix == "billing":
+            fields += ", billing_improved"
+        sections.append(f"## Check {number}: {title} ({fields})\n{instructions}")
+
+    return f"""
+    You are reviewing the session notes of one Housing Coordinator. Run each of the {len(checks)} checks below on every note and return all of their verdicts for each note in a single response, one entry per note with its note_index starting from zero.
+    The checks refer to the Session Notes given once at the end of this message, where each note carries its own nearby calls. Ignore the response format examples inside the checks and answer only through the issue_analysis function, filling the fields named in each check's heading.
+
+{chr(10).join(sections)}
+
+    **Session Notes**: {render_notes(data['notes'], note_fields())}
+    """
+
+
+def note_fields():
+    """Every note field read by one of the checks left to the model."""
+    fields = []
+    for script, _, _ in llm_checks():
+        fields += [f for f in load_stage(script).NOTE_FIELDS if f not in fields]
+    return fields
+
+
+def analyze_notes(data):
+    """Return the model's verdicts for the notes of a bundle by note index."""
+    description = build_description(data)
+    prompt_stats.record("fused", description)
+    analysis = analyze_issue(description)
+    fields = {}
+    for note_analysis in analysis["notes_analysis"]:
+        index = note_index(note_analysis, len(data["notes"]))
+        note_analysis.pop("note_index", None)
+        if index is not None:
+            fields.setdefault(index, {}).update(note_analysis)
+    return fields
+
+
+def analyze_board(data):
+    """Return the verdicts of all six checks for every note by note index."""
+    fields = {}
+    if qa_rules.RULE_CHECKS:
+        fields = qa_rules.rule_fields(data["notes"])
+    analyzed = analyze_changed_notes(
+        "fused",
+        attach_calls(data),
+        note_fields(),
+        analyze_notes,
+        prompt=build_description(EMPTY_BOARD),
+    )
+    for index, note_verdicts in (analyzed or {}).items():
+        fields.setdefault(index, {}).update(note_verdicts)
+    return fields
+
+
+def process_files(input_folder, output_folders):
+    # Get list of all JSON files in the input folder
+    json_files = [f for f in store.listdir(input_folder) if f.endswith(".json")]
+
+    # One completion per board answers all six checks; boards go out at once
+    futures = analyze_files(analyze_board, input_folder, json_files)
+    for filename, future in zip(json_files, futures):
+        try:
+            data, fields = future.result()
+            merge_note_fields(data, fields)
+
+            for output_folder in output_folders:
+                store.save(os.path.join(output_folder, filename), data, indent=2)
+            print(f"Processed {filename}")
+
+        except Exception as e:
+            print(f"Error processing {filename}: {str(e)}")
+
+
+def main():
+    # 12_2 reads the units from AI Revised 2, 11 the verdicts from AI Revised 6
+    process_files(FILTERED_NOTES, ["AI Revised 2", "AI Revised 6"])
+
+
+if __name__ == "__main__":
+    main()
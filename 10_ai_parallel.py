@@ -0,0 +1,55 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline import AI_PASS_SCRIPTS, FILTERED_NOTES, load_stage, store
+from qa_ai import merge_note_fields
+
+# Analyses in flight at once across all boards and passes
+QA_AI_WORKERS = int(os.getenv("QA_AI_WORKERS", "6"))
+
+
+def process_files(input_folder, output_folders):
+    """Run all six QA passes on each stage-9 bundle at once and merge them.
+
+    Every pass only adds its own fields, so they all read the same bundle
+    instead of the previous pass's output. A board then takes as long as
+    its slowest pass rather than the sum of the six.
+    """
+    passes = {script: load_stage(script) for script in AI_PASS_SCRIPTS}
+    json_files = [f for f in store.listdir(input_folder) if f.endswith(".json")]
+
+    with ThreadPoolExecutor(max_workers=max(1, QA_AI_WORKERS)) as executor:
+        boards = []
+        for filename in json_files:
+            data = store.load(os.path.join(input_folder, filename))
+            futures = {
+                script: executor.submit(module.analyze_board, data)
+                for script, module in passes.items()
+            }
+            boards.append((filename, data, futures))
+
+        for filename, data, futures in boards:
+            # Merged only once every pass has read the untouched bundle
+            results = {}
+            for script, future in futures.items():
+                try:
+                    results[script] = future.result()
+                except Exception as e:
+                    print(f"Error in {script} for {filename}: {str(e)}")
+            for script in AI_PASS_SCRIPTS:
+                if results.get(script) is None:
+                    print(f"Warning: No {script} results for {filename}")
+                merge_note_fields(data, results.get(script))
+
+            for output_folder in output_folders:
+                store.save(os.path.join(output_folder, filename), data, indent=2)
+            print(f"Processed {filename} with {len(results)} of {len(passes)} passes")
+
+
+def main():
+    # 12_2 reads the units from AI Revised 2, 11 the verdicts from AI Revised 6
+    process_files(FILTERED_NOTES, ["AI Revised 2", "AI Revised 6"])
+
+
+if __name__ == "__main__":
+    main()
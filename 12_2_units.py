@@ -1,168 +1,114 @@
 import os
-import json
 from dotenv import load_dotenv
-import requests
+from monday_api import post_query
+from pipeline import store
 
 load_dotenv()
-api = os.getenv("MONDAY_API_KEY")
 
-
-url = "https://api.monday.com/v2"
-
-headers = {
-    "Content-Type": "application/json",
-    "Authorization": api,
-}
+BOARD_ID = 8198737855
+final_dir = "AI Revised 2"
+output_dir = "Output_units"
 
 
-query = """
+def fetch_columns():
+    """Save the columns of the board for reference."""
+    query = """
 query {
-  boards (ids: 8198737855) {
+  boards (ids: %s) {
     columns {
       id
       title
     }
   }
 }
-"""
-
-payload = {"query": query}
-
-response = requests.post(url, json=payload, headers=headers)
-
-if response.status_code == 200:
-    data = response.json()
-    # Save response to a JSON file
-    with open("_columns_units.json", "w") as json_file:
-        json.dump(data, json_file, indent=4)
-    print("Response saved to monday_response.json")
-else:
-    print("Failed to retrieve data. Status code:", response.status_code)
-
-
-# ===============
-# -----------------
+""" % BOARD_ID
 
+    response = post_query(query)
 
-import os
-import json
-from dotenv import load_dotenv
-import requests
-
-load_dotenv()
-api = os.getenv("MONDAY_API_KEY")
-
-
-url = "https://api.monday.com/v2"
-
-headers = {
-    "Content-Type": "application/json",
-    "Authorization": api,
-}
+    if response.status_code == 200:
+        data = response.json()
+        # Save response to a JSON file
+        store.save("_columns_units.json", data)
+        print("Response saved to _columns_units.json")
+    else:
+        print("Failed to retrieve data. Status code:", response.status_code)
 
 
-query = """
+def fetch_groups():
+    """Fetch the groups of the board, one per staff member."""
+    query = """
 query {
-  boards (ids: 8198737855) {
+  boards (ids: %s) {
     groups {
       title
       id
     }
   }
 }
-"""
-
-payload = {"query": query}
-
-response = requests.post(
-    url, headers=headers, json=payload
-)
-
-# Step 5: Handle the response
-if response.status_code == 200:
-    data = response.json()
-    # Extract and print the groups data
-    boards = data.get("data", {}).get("boards", [])
-    for board in boards:
-        groups = board.get("groups", [])
-        with open("_groups_units.json", "w") as f:
-            json.dump(groups, f, indent=4)
-        for group in groups:
-            print(f"Title: {group['title']}, ID: {group['id']}")
-
-
-else:
-    # If something went wrong, print the error message
-    print(f"Error: {response.status_code}")
-    print(response.text)
-
-
-# --------------
-
-import json
-
-# Load init.json data
-with open("data/reference/init.json", "r") as f:
-    init_data = json.load(f)
-
-# Load _groups.json data
-with open("_groups_units.json", "r") as f:
-    groups_data = json.load(f)
-
-# Create a mapping from title to id
-title_to_id = {group["title"]: group["id"] for group in groups_data}
-
-# Update each item in init_data with group_name if it matches
-for item in init_data:
-    staff_member = item["Staff Member"]
-    if staff_member in title_to_id:
-        item["group_name"] = title_to_id[staff_member]
+""" % BOARD_ID
+
+    response = post_query(query)
+
+    groups = []
+    if response.status_code == 200:
+        data = response.json()
+        # Extract and print the groups data
+        boards = data.get("data", {}).get("boards", [])
+        for board in boards:
+            groups = board.get("groups", [])
+            store.save("_groups_units.json", groups)
+            for group in groups:
+                print(f"Title: {group['title']}, ID: {group['id']}")
     else:
-        # Optional: handle members without a matching group
-        print(f"No matching group found for Staff Member: {staff_member}")
+        # If something went wrong, print the error message
+        print(f"Error: {response.status_code}")
+        print(response.text)
+    return groups
 
-# Save the updated init.json
-with open("data/reference/init.json", "w") as f:
-    json.dump(init_data, f, indent=4)
 
-# ----------------
-# ==================
+def main():
+    fetch_columns()
+    groups_data = fetch_groups()
 
+    # Create a mapping from title to id
+    title_to_id = {group["title"]: group["id"] for group in groups_data}
 
-import json
-import os
-
-# Step 1: Read init.json and create mapping
-with open("data/reference/init.json", "r") as f:
-    init_data = json.load(f)
+    # Update each item in init_data with group_name if it matches
+    init_data = store.load("data/reference/init.json")
+    for item in init_data:
+        staff_member = item["Staff Member"]
+        if staff_member in title_to_id:
+            item["group_name"] = title_to_id[staff_member]
+        else:
+            # Optional: handle members without a matching group
+            print(f"No matching group found for Staff Member: {staff_member}")
 
-board_id_to_group = {item["Board_id"]: item["group_name"] for item in init_data}
+    # Save the updated init.json
+    store.save("data/reference/init.json", init_data)
 
-# Step 2: Set directories
-final_dir = "AI Revised 2"
-output_dir = "Output_units"
+    board_id_to_group = {
+        item["Board_id"]: item.get("group_name") for item in init_data
+    }
 
-# Create output directory if it doesn't exist
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
-
-# Step 3: Process each file in Final directory
-for filename in os.listdir(final_dir):
-    if filename.endswith(".json"):
-        # Extract Board_id from filename
-        board_id = filename[:-5]  # Remove '.json' extension
-        group_name = board_id_to_group.get(board_id)
-        if group_name:
-            # Read the file content
-            with open(os.path.join(final_dir, filename), "r") as f:
-                data = json.load(f)
-            # Add group_name to each notes item
-            notes_list = data.get("notes", [])
-            for note in notes_list:
-                note["group_name"] = group_name
-            # Save the modified content to Output directory
-            with open(os.path.join(output_dir, filename), "w") as f:
-                json.dump(data, f, indent=4)
-            print(f"Processed and saved {filename}")
-        else:
-            print(f"No matching group_name for {filename}")
+    # Process each file in the input directory
+    for filename in store.listdir(final_dir):
+        if filename.endswith(".json"):
+            # Extract Board_id from filename
+            board_id = filename[:-5]  # Remove '.json' extension
+            group_name = board_id_to_group.get(board_id)
+            if group_name:
+                # Read the file content
+                data = store.load(os.path.join(final_dir, filename))
+                # Add group_name to each notes item
+                notes_list = data.get("notes", [])
+                for note in notes_list:
+                    note["group_name"] = group_name
+                # Save the modified content to the output directory
+                store.save(os.path.join(output_dir, filename), data)
+                print(f"Processed and saved {filename}")
+            else:
+                print(f"No matching group_name for {filename}")
+
+
+if __name__ == "__main__":
+    main()
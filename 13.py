@@ -1,17 +1,10 @@
 import os
 import json
-from dotenv import load_dotenv
-import requests
 from datetime import datetime
+from monday_api import create_prepared_items
+from pipeline import store
 
-# Load environment variables
-load_dotenv()
-api = os.getenv("MONDAY_API_KEY")
-url = "https://api.monday.com/v2"
-headers = {
-    "Content-Type": "application/json",
-    "Authorization": api,
-}
+QA_BOARD_ID = "8139951792"
 
 # Existing status mapping dictionaries
 SERVICE_TYPE_MAP = {
@@ -202,55 +195,6 @@ HOUSING_SERVICES_MAP = {
 # New status mapping for flag statuses
 
 
-def update_column_value(item_id, board_id, column_id, value):
-    if value is None:
-        print(f"Skipping update for {column_id} due to null value")
-        return True
-
-    mutation = """
-    mutation {
-        change_simple_column_value (
-            item_id: %s, 
-            board_id: %s, 
-            column_id: "%s", 
-            value: "%s"
-        ) {
-            id
-        }
-    }
-    """ % (
-        item_id,
-        board_id,
-        column_id,
-        str(value),
-    )
-
-    try:
-        response = requests.post(url,
-                                 json={"query": mutation},
-                                 headers=headers)
-        response_data = response.json()
-
-        if response.status_code == 200 and "data" in response_data:
-            print(
-                f"Updated {column_id} column for item {item_id} with value {value}"
-            )
-            return True
-        else:
-            error_message = response_data.get("errors",
-                                              [{
-                                                  "message": "Unknown error"
-                                              }])[0]["message"]
-            print(
-                f"Error updating {column_id} for item {item_id}: {error_message}"
-            )
-            return False
-
-    except Exception as e:
-        print(f"Error updating {column_id} for item {item_id}: {str(e)}")
-        return False
-
-
 def format_datetime(date_str, time_str):
     if date_str is None or time_str is None:
         return None
@@ -263,7 +207,12 @@ def format_datetime(date_str, time_str):
         return None
 
 
-def get_mapped_status(value, status_map, default="3"):
+def get_mapped_status(value, status_map, default=None):
+    """Map a value to its status index, None when the map does not know it.
+
+    monday rejects a label its status column does not have, so an unknown
+    value leaves the column out rather than guessing an index.
+    """
     if value is None:
         return default
     return status_map.get(value, default)
@@ -275,167 +224,96 @@ def safe_get(note, key, default=None):
     return value if value is not None else default
 
 
-def update_all_columns(item_id, board_id, note, board_id_from_filename):
-    try:
-        # [Previous column updates remain the same...]
-
-        # Format date for date column
-        date_str = safe_get(note, "date")
-        if date_str is not None:
-            date_value, year_value = format_date_values(date_str)
-            if date_value is not None:
-                update_column_value(item_id, board_id, "date", date_value)
-            if year_value is not None:
-                update_column_value(item_id, board_id, "year", year_value)
-
-        # Update start time
-        start_time = format_datetime(safe_get(note, "date"),
-                                     safe_get(note, "start_time"))
-        if start_time is not None:
-            update_column_value(item_id, board_id, "date_13", start_time)
-
-        # Update end time
-        end_time = format_datetime(safe_get(note, "date"),
-                                   safe_get(note, "end_time"))
-        if end_time is not None:
-            update_column_value(item_id, board_id, "date_19", end_time)
-
-        # Update manual units
-        manual_units = safe_get(note, "manual_units")
-        if manual_units is not None:
-            manual_units_str = str(manual_units).strip('"')
-            update_column_value(item_id, board_id, "numbers1",
-                                manual_units_str)
-
-        # Update service type status
-        service_type_value = get_mapped_status(safe_get(note, "service_type"),
-                                               SERVICE_TYPE_MAP)
-        if service_type_value is not None:
-            update_column_value(item_id, board_id, "status80",
-                                service_type_value)
-
-        # Update provided as status
-        provided_as_value = get_mapped_status(safe_get(note, "provided_as"),
-                                              PROVIDED_AS_MAP)
-        if provided_as_value is not None:
-            update_column_value(item_id, board_id, "status4",
-                                provided_as_value)
-
-        # Update severity status for transcripts
-        severity_value = get_mapped_status(
-            safe_get(note, "transcript_severity"), FLAG_STATUS_MAP_TRANSCRIPTS)
-        if severity_value is not None:
-            update_column_value(item_id, board_id, "severity_flags_mkks6sc7",
-                                severity_value)
-
-        # Update issue_description with transcript reason
-        transcript_reason = safe_get(note, "transcript_reason")
-        if transcript_reason is not None:
-            update_column_value(item_id, board_id,
-                                "issue_description_mkm0j7qm",
-                                transcript_reason)
-
-        # Update original text body
-        original_text_body = safe_get(note, "update_text_body")
-        if original_text_body is not None:
-            update_column_value(item_id, board_id, "original_note_mkm0z2v3",
-                                original_text_body)
-
-        # Update link
-        link = safe_get(note, "item_id")
-        if link is not None:
-            item_link = f"https://simplehealthservices.monday.com/boards/{board_id_from_filename}/pulses/{link}"
-            update_column_value(item_id, board_id,
-                                "link_to_original_note_mkm09qb0", item_link)
-
-        # Update start and end reason text columns
-        start_reason = safe_get(note, "start_reason")
-        if start_reason is not None:
-            update_column_value(item_id, board_id, "text_mkm1vk1y",
-                                start_reason)
-
-        end_reason = safe_get(note, "end_reason")
-        if end_reason is not None:
-            update_column_value(item_id, board_id, "text_mkm1d8wd", end_reason)
-
-        # Update start severity flag
-        start_severity = safe_get(note, "start_severity", "Good")
-        if start_severity is not None:
-            start_severity_value = AI_start_SEVERITY_MAP.get(
-                start_severity, "3")
-            update_column_value(item_id, board_id,
-                                "dup__of_severity_flags_mkm19yh",
-                                start_severity_value)
-
-        # Update end severity flag
-        end_severity = safe_get(note, "end_severity", "Good")
-        if end_severity is not None:
-            end_severity_value = AI_end_SEVERITY_MAP.get(end_severity, "3")
-            update_column_value(item_id, board_id, "status_mkm1fy0n",
-                                end_severity_value)
-
-        # Update billing reason
-        billing_reason = safe_get(note, "billing_reason")
-        if billing_reason is not None:
-            update_column_value(item_id, board_id, "text_mkm2sxx6",
-                                billing_reason)
-
-        # Update billing improved
-        billing_improved = safe_get(note, "billing_improved")
-        if billing_improved is not None:
-            update_column_value(item_id, board_id, "text_mkm2ez8j",
-                                billing_improved)
-
-        # Update billing status
-        billing_status = safe_get(note, "billing_severity")
-        if billing_status is not None:
-            billing_status_value = BILLING_STATUS_MAP.get(
-                billing_status.lower(), "")
-            update_column_value(item_id, board_id, "status_mkm2zs2v",
-                                billing_status_value)
-
-        # New column updates start here
-
-        # Update service reason text
-        service_reason = safe_get(note, "service_reason")
-        if service_reason is not None:
-            update_column_value(item_id, board_id, "long_text_mkm545rp",
-                                service_reason)
-
-        # Update columns reason text
-        columns_reason = safe_get(note, "columns_reason")
-        if columns_reason is not None:
-            update_column_value(item_id, board_id, "text_mkm5tqa7",
-                                columns_reason)
-
-        # Update housing services status
-        housing_service = safe_get(note, "service_line")
-        if housing_service is not None:
-            housing_service_value = HOUSING_SERVICES_MAP.get(
-                housing_service, "5")  # Default to "5" if not found
-            update_column_value(item_id, board_id, "status_mkm5hyx0",
-                                housing_service_value)
-
-        # Update flag status columns
-        flag_status1 = safe_get(note, "service_severity")
-        if flag_status1 is not None:
-            flag_status_value1 = FLAG_STATUS_MAP.get(
-                flag_status1, "1")  # Default to "Good" if not found
-            update_column_value(item_id, board_id, "status_mkm64aec",
-                                flag_status_value1)
-
-        flag_status2 = safe_get(note, "columns_severity")
-        if flag_status2 is not None:
-            flag_status_value2 = FLAG_STATUS_MAP.get(
-                flag_status2, "1")  # Default to "Good" if not found
-            update_column_value(item_id, board_id, "status_mkm5aj0m",
-                                flag_status_value2)
-
-    except Exception as e:
-        print(f"Error in update_all_columns for item {item_id}: {str(e)}")
-        return False
-
-    return True
+def build_column_values(note, board_id_from_filename):
+    """Collect every QA column value of a note into one column_values dict."""
+    column_values = {}
+
+    def set_value(column_id, value):
+        if value is not None:
+            column_values[column_id] = str(value)
+
+    # Format date for date column
+    date_str = safe_get(note, "date")
+    if date_str is not None:
+        date_value, year_value = format_date_values(date_str)
+        set_value("date", date_value)
+        set_value("year", year_value)
+
+    # Start and end time
+    set_value("date_13",
+              format_datetime(safe_get(note, "date"),
+                              safe_get(note, "start_time")))
+    set_value("date_19",
+              format_datetime(safe_get(note, "date"),
+                              safe_get(note, "end_time")))
+
+    # Manual units
+    manual_units = safe_get(note, "manual_units")
+    if manual_units is not None:
+        set_value("numbers1", str(manual_units).strip('"'))
+
+    # Service type and provided as statuses
+    set_value("status80",
+              get_mapped_status(safe_get(note, "service_type"),
+                                SERVICE_TYPE_MAP))
+    set_value("status4",
+              get_mapped_status(safe_get(note, "provided_as"),
+                                PROVIDED_AS_MAP))
+
+    # Transcript severity and reason
+    set_value("severity_flags_mkks6sc7",
+              get_mapped_status(safe_get(note, "transcript_severity"),
+                                FLAG_STATUS_MAP_TRANSCRIPTS))
+    set_value("issue_description_mkm0j7qm",
+              safe_get(note, "transcript_reason"))
+
+    # Original text body and link to the original note
+    set_value("original_note_mkm0z2v3", safe_get(note, "update_text_body"))
+    link = safe_get(note, "item_id")
+    if link is not None:
+        set_value(
+            "link_to_original_note_mkm09qb0",
+            f"https://simplehealthservices.monday.com/boards/{board_id_from_filename}/pulses/{link}"
+        )
+
+    # Start and end reason text columns
+    set_value("text_mkm1vk1y", safe_get(note, "start_reason"))
+    set_value("text_mkm1d8wd", safe_get(note, "end_reason"))
+
+    # Start and end severity flags
+    set_value("dup__of_severity_flags_mkm19yh",
+              get_mapped_status(safe_get(note, "start_severity", "Good"),
+                                AI_start_SEVERITY_MAP))
+    set_value("status_mkm1fy0n",
+              get_mapped_status(safe_get(note, "end_severity", "Good"),
+                                AI_end_SEVERITY_MAP))
+
+    # Billing reason, improved note and status
+    set_value("text_mkm2sxx6", safe_get(note, "billing_reason"))
+    set_value("text_mkm2ez8j", safe_get(note, "billing_improved"))
+    billing_status = safe_get(note, "billing_severity")
+    if billing_status is not None:
+        set_value("status_mkm2zs2v",
+                  get_mapped_status(billing_status.lower(), BILLING_STATUS_MAP))
+
+    # Service and columns reason text
+    set_value("long_text_mkm545rp", safe_get(note, "service_reason"))
+    set_value("text_mkm5tqa7", safe_get(note, "columns_reason"))
+
+    # Housing services status
+    set_value("status_mkm5hyx0",
+              get_mapped_status(safe_get(note, "service_line"),
+                                HOUSING_SERVICES_MAP))
+
+    # Flag status columns
+    set_value("status_mkm64aec",
+              get_mapped_status(safe_get(note, "service_severity"),
+                                FLAG_STATUS_MAP))
+    set_value("status_mkm5aj0m",
+              get_mapped_status(safe_get(note, "columns_severity"),
+                                FLAG_STATUS_MAP))
+
+    return column_values
 
 
 def format_date_values(date_str):
@@ -451,23 +329,23 @@ def format_date_values(date_str):
         return None, None
 
 
-def process_json_file(filename):
+def prepare_json_file(filename):
+    """Build the create_item payload of every note in a board file."""
     file_path = filename
-    created_items = []
+    prepared = []
 
     try:
-        with open(file_path, "r") as file:
-            data = json.load(file)
+        data = store.load(file_path)
 
         notes = data.get("notes", [])
         if not notes:
             print(f"No notes found in {filename}")
-            return created_items
+            return prepared
 
         group_id = notes[0].get("group_name", "")
         if not group_id:
             print(f"No group_id found in {filename}")
-            return created_items
+            return prepared
 
         board_id_from_filename = os.path.splitext(
             os.path.basename(filename))[0]
@@ -481,47 +359,11 @@ def process_json_file(filename):
                 print(f"Skipping note without title in {filename}")
                 continue
 
-            mutation = """
-            mutation {
-                create_item(
-                    board_id: 8139951792,
-                    group_id: "%s",
-                    item_name: "%s") {
-                    id
-                }
-            }
-            """ % (
-                group_id,
-                group_title.replace('"', '\\"'),
-            )
-
             try:
-                response = requests.post(url,
-                                         json={"query": mutation},
-                                         headers=headers)
-                response_data = response.json()
-
-                if response.status_code == 200 and "data" in response_data:
-                    item_id = response_data["data"]["create_item"]["id"]
-                    created_items.append(item_id)
-                    print(
-                        f"Created item with ID: {item_id} for group {group_id}, title: {group_title}"
-                    )
-
-                    update_all_columns(item_id, "8139951792", note,
-                                       board_id_from_filename)
-
-                else:
-                    error_message = response_data.get(
-                        "errors", [{
-                            "message": "Unknown error"
-                        }])[0]["message"]
-                    print(
-                        f"Error creating item for {filename}, note {note.get('item_name')}: {error_message}"
-                    )
-
-            except requests.exceptions.RequestException as e:
-                print(f"Request error for {filename}: {str(e)}")
+                column_values = build_column_values(note,
+                                                    board_id_from_filename)
+                prepared.append(
+                    (filename, note, (group_id, group_title, column_values)))
             except Exception as e:
                 print(
                     f"Unexpected error processing note in {filename}: {str(e)}"
@@ -532,19 +374,24 @@ def process_json_file(filename):
     except Exception as e:
         print(f"Error processing file {filename}: {str(e)}")
 
-    return created_items
+    return prepared
+
+
+def process_json_file(filename):
+    return create_prepared_items(QA_BOARD_ID, prepare_json_file(filename))
 
 
 def main():
     dir_path = "Output/"  # Update this to your directory path
-    all_created_items = []
+    prepared = []
 
-    for filename in os.listdir(dir_path):
+    for filename in store.listdir(dir_path):
         if filename.endswith(".json"):
             full_path = os.path.join(dir_path, filename)
             print(f"\nProcessing {filename}...")
-            created_items = process_json_file(full_path)
-            all_created_items.extend(created_items)
+            prepared.extend(prepare_json_file(full_path))
+
+    all_created_items = create_prepared_items(QA_BOARD_ID, prepared)
 
     print("\nAll created item IDs in order:")
     for item_id in all_created_items:
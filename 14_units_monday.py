@@ -0,0 +1,100 @@
+import os
+import json
+import qa_dates
+from monday_api import create_prepared_items
+from pipeline import store
+
+UNITS_BOARD_ID = "8198737855"
+
+# New status mapping for flag statuses
+FLAG_STATUS_MAP = {"Good": "1", "Flagged": "0"}
+
+
+def safe_get(note, key, default=None):
+    """Safely get a value from the note dictionary"""
+    value = note.get(key, default)
+    return value if value is not None else default
+
+
+def build_column_values(note):
+    """Collect the daily units columns of a note into one column_values dict."""
+    column_values = {}
+
+    date_str = qa_dates.target_date()
+    if date_str is not None:
+        column_values["date4"] = date_str
+
+    units_added = safe_get(note, "total_units")
+    if units_added is not None:
+        column_values["numbers_mkm6axzx"] = str(units_added)
+
+    units_status = safe_get(note, "units_status")
+    if units_status is not None:
+        column_values["status_mkm61j"] = FLAG_STATUS_MAP.get(
+            units_status, "1"
+        )  # Default to "Good" if not found
+
+    units_reason = safe_get(note, "units_reason")
+    if units_reason is not None:
+        column_values["long_text_mkm6wg9t"] = units_reason
+
+    return column_values
+
+
+def prepare_json_file(filename):
+    """Build the create_item payload of the daily units report of a board."""
+    file_path = filename
+    prepared = []
+    try:
+        data = store.load(file_path)
+        notes = data.get("notes", [])
+        if not notes:
+            print(f"No notes found in {filename}")
+            return prepared
+        group_id = notes[0].get("group_name", "")
+        if not group_id:
+            print(f"No group_id found in {filename}")
+            return prepared
+
+        board_id_from_filename = os.path.splitext(os.path.basename(filename))[0]
+        print(f"Processing {board_id_from_filename} with group_id: {group_id}")
+
+        for day_number, note in enumerate(notes, 1):
+            group_title = "Daily Units Report"
+            try:
+                prepared.append(
+                    (filename, note, (group_id, group_title, build_column_values(note)))
+                )
+            except Exception as e:
+                print(f"Unexpected error processing note in {filename}: {str(e)}")
+    except json.JSONDecodeError as e:
+        print(f"Error parsing JSON in {filename}: {str(e)}")
+    except Exception as e:
+        print(f"Error processing file {filename}: {str(e)}")
+    return prepared
+
+
+def process_json_file(filename):
+    return create_prepared_items(UNITS_BOARD_ID, prepare_json_file(filename))
+
+
+def main():
+    dir_path = "Output_units/"  # Update this to your directory path
+    prepared = []
+
+    for filename in store.listdir(dir_path):
+        if filename.endswith(".json"):
+            full_path = os.path.join(dir_path, filename)
+            print(f"\nProcessing {filename}...")
+            prepared.extend(prepare_json_file(full_path))
+
+    all_created_items = create_prepared_items(UNITS_BOARD_ID, prepared)
+
+    print("\nAll created item IDs in order:")
+    for item_id in all_created_items:
+        print(item_id)
+    print(f"\nTotal items created: {len(all_created_items)}")
+
+
+if __name__ == "__main__":
+    main()
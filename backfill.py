@@ -0,0 +1,131 @@
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from pytz import timezone
+
+import qa_dates
+from pipeline import ai_stage_scripts, load_stage, run_stage, store
+from remover import day_outputs, delete_files_in_dirs, dirs_to_clean
+
+# Stages that download raw data; run once for the whole date range
+fetch_scripts = [
+    "01_reference_collecter.py",
+    "02.py",
+    "04_call_logs_retriever.py",
+    "05_call_ids_retriever.py",
+]
+
+# Stages that analyze and write back a single day
+day_scripts = [
+    "07_call_transcript_retriever.py",
+    "08_call_transcript_cleaner.py",
+    "09_calls_notes_combiner.py",
+    *ai_stage_scripts(),
+    "11_CST_to_UTC.py",
+    "12_1_groups_columns_fetcher.py",
+    "12_2_units.py",
+    "13.py",
+    "14_hired_units.py",
+    "14_units_monday.py",
+]
+
+cleaned_dir = "data/notes/cleaned_notes"
+filtered_dir = "data/notes/filtered_notes"
+phone_details_path = "data/reference/phone_details.json"
+
+
+def partition_notes(directory):
+    """Split every cleaned board file into its notes per day in one pass."""
+    notes_by_day = defaultdict(lambda: defaultdict(list))
+    filenames = [f for f in store.listdir(directory) if f.endswith(".json")]
+    for filename in filenames:
+        for note in store.load(os.path.join(directory, filename)):
+            notes_by_day[note.get("date")][filename].append(note)
+    return filenames, notes_by_day
+
+
+def partition_calls(calls, call_date):
+    """Split the matched calls by the CST day they started on."""
+    calls_by_day = defaultdict(list)
+    for call in calls:
+        calls_by_day[call_date(call)].append(call)
+    return calls_by_day
+
+
+def write_day_inputs(day, filenames, notes_by_day, calls_by_day):
+    """Hand the filtered notes and calls of one day to stage 07."""
+    for filename in filenames:
+        store.save(
+            os.path.join(filtered_dir, filename), notes_by_day[day].get(filename, [])
+        )
+    store.save(phone_details_path, calls_by_day[day])
+
+
+def backfill(start_date, end_date):
+    """Fetch raw data once and run the day stages for every day in the range.
+
+    A failed fetch aborts the backfill, since every day would be analyzed
+    from incomplete data. A day whose stage fails skips its remaining
+    stages, so nothing is written back from a half-finished day. Returns
+    whether every day completed.
+    """
+    days = qa_dates.date_range(start_date, end_date)
+    print(f"Backfilling {len(days)} days from {start_date} to {end_date}")
+    store.checkpoint = os.getenv("PIPELINE_CHECKPOINT") == "1"
+
+    os.environ["NOTES_START_DATE"] = start_date
+    os.environ["NOTES_END_DATE"] = end_date
+    for script in fetch_scripts:
+        if not run_stage(script):
+            print(f"Backfill aborted: {script} failed, no day was analyzed")
+            return False
+
+    # Notes and calls are cleaned once and partitioned by day in one pass
+    load_stage("03_notes_cleaner.py").clean_raw_notes(cleaned_dir=cleaned_dir)
+    combiner = load_stage("06_call_logs_ids_combiner.py")
+    calls = combiner.prepare_call_details(phone_details_path)
+
+    filenames, notes_by_day = partition_notes(cleaned_dir)
+    calls_by_day = partition_calls(calls, combiner.call_date)
+
+    failed_days = []
+    for day in days:
+        print(
+            f"\n=== {day}: {sum(len(n) for n in notes_by_day[day].values())} notes, "
+            f"{len(calls_by_day[day])} calls ==="
+        )
+        delete_files_in_dirs(day_outputs)
+        write_day_inputs(day, filenames, notes_by_day, calls_by_day)
+
+        os.environ["QA_TARGET_DATE"] = day
+        for script in day_scripts:
+            if not run_stage(script):
+                print(f"Skipping the rest of {day}: {script} failed")
+                failed_days.append(day)
+                break
+
+    delete_files_in_dirs(dirs_to_clean)
+    if failed_days:
+        print(f"Backfill incomplete, failed days: {', '.join(failed_days)}")
+    return not failed_days
+
+
+def default_range(days=16):
+    """The last ``days`` days before today in CST, as the quick scripts covered."""
+    today = datetime.now(timezone("US/Central"))
+    start = (today - timedelta(days=days)).strftime("%Y-%m-%d")
+    end = (today - timedelta(days=1)).strftime("%Y-%m-%d")
+    return start, end
+
+
+if __name__ == "__main__":
+    # Usage: python backfill.py [START_DATE [END_DATE]]
+    if len(sys.argv) > 1:
+        start_date = sys.argv[1]
+        end_date = sys.argv[2] if len(sys.argv) > 2 else start_date
+    else:
+        start_date, end_date = default_range(int(os.getenv("QA_BACKFILL_DAYS", "16")))
+    if not backfill(start_date, end_date):
+        sys.exit(1)
@@ -0,0 +1,595 @@
+import os
+import re
+import json
+import time
+import threading
+import requests
+from datetime import datetime, timedelta
+from itertools import islice
+from dotenv import load_dotenv
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+load_dotenv()
+api = os.getenv("MONDAY_API_KEY")
+url = "https://api.monday.com/v2"
+headers = {
+    "Content-Type": "application/json",
+    "Authorization": api,
+}
+
+
+# Per-minute complexity budget of an account's API token
+COMPLEXITY_BUDGET_PER_MINUTE = 10_000_000
+# Requests in flight at once across every thread of the process
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MONDAY_MAX_CONCURRENT_REQUESTS", "5"))
+# How many times a request is re-sent after the budget ran out
+BUDGET_RETRIES = 3
+
+COMPLEXITY_FIELD = "complexity { before after query reset_in_x_seconds }"
+
+
+class ComplexityScheduler:
+    """Pace monday requests against the live per-minute complexity budget.
+
+    Every response reports the budget left and when it resets. Requests go
+    out immediately while the remaining budget covers their expected cost,
+    and only wait for the reset once it does not.
+    """
+
+    def __init__(self, budget_per_minute: int = COMPLEXITY_BUDGET_PER_MINUTE):
+        self.budget_per_minute = budget_per_minute
+        self.remaining = budget_per_minute
+        self.reset_at = 0.0
+        self.query_costs: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, query: str) -> int:
+        """Wait until the budget covers the query and reserve its cost."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now >= self.reset_at:
+                    self.remaining = self.budget_per_minute
+                    self.reset_at = now + 60
+                cost = self.query_costs.get(query, 0)
+                if self.remaining > 0 and cost <= self.remaining:
+                    self.remaining -= cost
+                    return cost
+                wait = self.reset_at - now
+            print(f"Complexity budget low, waiting {wait:.1f} seconds for reset")
+            time.sleep(wait)
+
+    def record(self, query: str, reserved: int, complexity: Optional[dict]) -> None:
+        """Update the budget from the complexity block of a response."""
+        with self.lock:
+            if not complexity:
+                self.remaining += reserved
+                return
+            self.query_costs[query] = complexity.get("query") or 0
+            self.remaining = complexity.get("after", self.remaining)
+            reset_in = complexity.get("reset_in_x_seconds")
+            if reset_in is not None:
+                self.reset_at = time.monotonic() + reset_in
+
+    def exhausted(self, reset_in: float) -> None:
+        """Mark the budget as spent until monday says it resets."""
+        with self.lock:
+            self.remaining = 0
+            self.reset_at = time.monotonic() + reset_in
+
+
+scheduler = ComplexityScheduler()
+request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+
+def operation_selection(query: str) -> Optional[int]:
+    """Index of the "{" that opens the operation's top-level selection set.
+
+    Variable definitions and arguments, strings, comments and fragment
+    definitions are skipped, so their braces are never taken for it.
+    """
+    depth = parens = 0
+    in_string = False
+    definition_start = 0
+    index = 0
+    while index < len(query):
+        char = query[index]
+        if in_string:
+            if char == "\\":
+                index += 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "#":
+            newline = query.find("\n", index)
+            index = len(query) if newline == -1 else newline
+        elif char == "(":
+            parens += 1
+        elif char == ")":
+            parens -= 1
+        elif char == "{" and not parens:
+            if depth == 0:
+                words = query[definition_start:index].split()
+                if not words or words[0] != "fragment":
+                    return index
+            depth += 1
+        elif char == "}" and not parens:
+            depth -= 1
+            if depth == 0:
+                definition_start = index + 1
+        index += 1
+    return None
+
+
+def with_complexity(query: str) -> str:
+    """Ask monday to report the complexity cost and budget of a query."""
+    if "complexity {" in query:
+        return query
+    opening = operation_selection(query)
+    if opening is None:
+        return query
+    opening += 1
+    return query[:opening] + "\n    " + COMPLEXITY_FIELD + query[opening:]
+
+
+def budget_reset_seconds(response: requests.Response) -> Optional[float]:
+    """Return how long to wait when monday rejected a request for budget."""
+    if response.status_code == 429:
+        return float(response.headers.get("Retry-After", 60))
+    try:
+        errors = response.json().get("errors") or []
+    except ValueError:
+        return None
+    for error in errors:
+        message = str(error.get("message", ""))
+        match = re.search(r"reset in (\d+) seconds", message)
+        if match and "budget" in message.lower():
+            return float(match.group(1))
+        retry_in = (error.get("extensions") or {}).get("retry_in_seconds")
+        if retry_in is not None:
+            return float(retry_in)
+    return None
+
+
+def post_query(
+    query: str, variables: Optional[dict] = None, timeout: int = 30
+) -> requests.Response:
+    """Send a GraphQL document as soon as the complexity budget allows."""
+    query = with_complexity(query)
+    payload = {"query": query}
+    if variables is not None:
+        payload["variables"] = variables
+
+    for attempt in range(BUDGET_RETRIES + 1):
+        reserved = scheduler.acquire(query)
+        complexity = None
+        try:
+            with request_slots:
+                response = requests.post(
+                    url, json=payload, headers=headers, timeout=timeout
+                )
+
+            reset_in = budget_reset_seconds(response)
+            if reset_in is None or attempt == BUDGET_RETRIES:
+                try:
+                    complexity = (response.json().get("data") or {}).get("complexity")
+                except ValueError:
+                    complexity = None
+                return response
+        finally:
+            # Without a complexity block, failed or rejected requests hand
+            # their reservation back
+            scheduler.record(query, reserved, complexity)
+
+        print(f"Complexity budget exhausted, retrying in {reset_in:.0f} seconds")
+        scheduler.exhausted(reset_in)
+
+    return response
+
+
+def run_query(query: str, variables: Optional[dict] = None) -> Tuple[dict, bool]:
+    """Post a GraphQL document to monday and report whether it succeeded."""
+    try:
+        response = post_query(query, variables)
+        response_data = response.json()
+    except Exception as e:
+        print(f"Request to monday failed: {str(e)}")
+        return {"errors": [{"message": str(e)}]}, False
+
+    if response.status_code == 200 and "errors" not in response_data:
+        return response_data, True
+    return response_data, False
+
+
+def error_message(response_data: dict) -> str:
+    """Return the first GraphQL error message of a response."""
+    return response_data.get("errors", [{"message": "Unknown error"}])[0].get(
+        "message", "Unknown error"
+    )
+
+
+# monday rejects any single query above this complexity
+QUERY_COMPLEXITY_LIMIT = 5_000_000
+# Estimated complexity of one create_item mutation with column values
+CREATE_ITEM_COMPLEXITY = 30_000
+# Upper bound on mutations per document to keep request bodies small
+MAX_ITEMS_PER_PACK = 50
+
+
+def pack_size_for_complexity(
+    complexity_per_item: int = CREATE_ITEM_COMPLEXITY,
+    complexity_limit: int = QUERY_COMPLEXITY_LIMIT,
+    max_items: int = MAX_ITEMS_PER_PACK,
+) -> int:
+    """Return how many mutations fit into one document under the limit."""
+    return max(1, min(max_items, complexity_limit // complexity_per_item))
+
+
+def build_bulk_create_mutation(
+    board_id, items: List[Tuple[str, str, Dict[str, str]]]
+) -> Tuple[str, dict]:
+    """Build one aliased document creating every item in the pack."""
+    arguments = ["$boardId: ID!"]
+    fields = []
+    variables = {"boardId": str(board_id)}
+
+    for index, (group_id, item_name, column_values) in enumerate(items):
+        arguments.append(
+            f"$g{index}: String!, $n{index}: String!, $c{index}: JSON!"
+        )
+        fields.append(
+            f"n{index}: create_item(board_id: $boardId, group_id: $g{index}, "
+            f"item_name: $n{index}, column_values: $c{index}) {{ id }}"
+        )
+        variables[f"g{index}"] = group_id
+        variables[f"n{index}"] = item_name
+        variables[f"c{index}"] = json.dumps(column_values)
+
+    mutation = "mutation BulkCreate(%s) {\n    %s\n}" % (
+        ", ".join(arguments),
+        "\n    ".join(fields),
+    )
+    return mutation, variables
+
+
+def create_items_bulk(
+    board_id,
+    items: List[Tuple[str, str, Dict[str, str]]],
+    pack_size: Optional[int] = None,
+) -> List[Optional[str]]:
+    """Create many items with aliased mutations, a pack per request.
+
+    Returns the created item ids in the same order as ``items``, with None
+    for every item monday did not create.
+    """
+    pack_size = pack_size or pack_size_for_complexity()
+    created_ids: List[Optional[str]] = []
+
+    for start in range(0, len(items), pack_size):
+        created_ids.extend(_create_pack(board_id, items[start : start + pack_size]))
+
+    created = sum(1 for item_id in created_ids if item_id)
+    print(f"Created {created} of {len(items)} items on board {board_id}")
+    return created_ids
+
+
+def create_prepared_items(
+    board_id, prepared: List[Tuple[str, dict, Tuple[str, str, Dict[str, str]]]]
+) -> List[str]:
+    """Create the prepared (filename, note, item) entries of a board file.
+
+    Returns the ids of the items that were created, in order.
+    """
+    created_items = []
+    item_ids = create_items_bulk(board_id, [item for _, _, item in prepared])
+
+    # Returned ids line up with the prepared notes they were created from
+    for (filename, note, (group_id, group_title, _)), item_id in zip(
+        prepared, item_ids
+    ):
+        if item_id is not None:
+            created_items.append(item_id)
+            print(
+                f"Created item with ID: {item_id} for group {group_id}, title: {group_title}"
+            )
+        else:
+            print(
+                f"Error creating item for {filename}, note {note.get('item_name')}"
+            )
+    return created_items
+
+
+def _create_pack(
+    board_id, pack: List[Tuple[str, str, Dict[str, str]]], retry: bool = True
+) -> List[Optional[str]]:
+    """Send one pack, retrying the items monday rejected.
+
+    A pack that created nothing for complexity is halved and sent again.
+    When only some aliases failed, the created ids are kept and just the
+    failed items are resent, so no item is created twice. Items rejected
+    for another reason, usually a column value, are sent once more on their
+    own, and an item that still fails is sent without the rejected column
+    values, or without any if monday does not say which one it refused.
+    """
+    mutation, variables = build_bulk_create_mutation(board_id, pack)
+    response_data, success = run_query(mutation, variables)
+
+    # Aliases that failed come back as null next to the errors list
+    data = response_data.get("data") or {}
+    created_ids = [(data.get(f"n{index}") or {}).get("id") for index in range(len(pack))]
+    failed = [index for index, item_id in enumerate(created_ids) if not item_id]
+
+    if failed and not success and is_complexity_error(response_data):
+        if len(failed) < len(pack):
+            print(f"{len(failed)} of {len(pack)} items hit a limit, resending only those")
+            retried = _create_pack(board_id, [pack[index] for index in failed])
+            for index, item_id in zip(failed, retried):
+                created_ids[index] = item_id
+            return created_ids
+        if len(pack) > 1:
+            middle = len(pack) // 2
+            print(f"Pack of {len(pack)} items too complex, splitting in two")
+            return _create_pack(board_id, pack[:middle]) + _create_pack(
+                board_id, pack[middle:]
+            )
+    elif failed and retry:
+        message = error_message(response_data)
+        if len(pack) > 1:
+            print(f"{len(failed)} of {len(pack)} items failed ({message}), resending each alone")
+            for index in failed:
+                created_ids[index] = _create_pack(board_id, [pack[index]])[0]
+            return created_ids
+        group_id, item_name, column_values = pack[0]
+        if column_values:
+            rejected = rejected_column_ids(response_data)
+            kept = {
+                column_id: value
+                for column_id, value in column_values.items()
+                if column_id not in rejected
+            }
+            if len(kept) == len(column_values):
+                kept = {}
+            print(
+                f"Error creating item {item_name}: {message}, resending with "
+                f"{len(kept)} of {len(column_values)} column values"
+            )
+            return _create_pack(board_id, [(group_id, item_name, kept)], retry=False)
+
+    for index in failed:
+        print(f"Error creating item {pack[index][1]}: {error_message(response_data)}")
+    return created_ids
+
+
+def rejected_column_ids(response_data: dict) -> set:
+    """Collect the column ids monday names in its column value errors."""
+    rejected = set()
+    for error in response_data.get("errors", []):
+        extensions = error.get("extensions") or {}
+        error_data = extensions.get("error_data") or error.get("error_data") or {}
+        if error_data.get("column_id"):
+            rejected.add(error_data["column_id"])
+    return rejected
+
+
+def is_complexity_error(response_data: dict) -> bool:
+    """Tell whether monday rejected a query for its complexity or a limit."""
+    error_messages = [
+        str(error.get("message", "")).lower()
+        for error in response_data.get("errors", [])
+    ]
+    return any("complexity" in msg or "limit" in msg for msg in error_messages)
+
+
+def stream_board_items(
+    board_id,
+    item_fields: str,
+    page_limit: int = 200,
+    query_params: Optional[dict] = None,
+) -> Iterator[Tuple[dict, List[dict]]]:
+    """Yield every page of a board's items as a (group, items) pair.
+
+    Each group's items_page cursor is followed until it runs out; only the
+    cursor is kept between pages, so memory does not grow with the board.
+    ``query_params`` is passed to items_page so monday filters the items
+    before sending them.
+    """
+    query = """
+    query GetBoardItems($boardId: [ID!], $limit: Int!, $queryParams: ItemsQuery) {
+        boards(ids: $boardId) {
+            groups {
+                title
+                id
+                items_page(limit: $limit, query_params: $queryParams) {
+                    cursor
+                    items { %s }
+                }
+            }
+        }
+    }
+    """ % item_fields
+    next_page_query = """
+    query GetNextItems($cursor: String!, $limit: Int!) {
+        next_items_page(cursor: $cursor, limit: $limit) {
+            cursor
+            items { %s }
+        }
+    }
+    """ % item_fields
+
+    response_data, success = run_query(
+        query,
+        {"boardId": [str(board_id)], "limit": page_limit, "queryParams": query_params},
+    )
+    if not success:
+        print(f"Error fetching items from board {board_id}: {error_message(response_data)}")
+        return
+
+    groups = [
+        group
+        for board in response_data.get("data", {}).get("boards", [])
+        for group in board.get("groups", [])
+    ]
+    del response_data
+    while groups:
+        group = groups.pop(0)
+        page = group.pop("items_page", None) or {}
+        while True:
+            yield group, page.get("items", [])
+
+            cursor = page.get("cursor")
+            if not cursor:
+                break
+            page_data, success = run_query(
+                next_page_query, {"cursor": cursor, "limit": page_limit}
+            )
+            if not success:
+                print(
+                    f"Error fetching next page of group {group.get('id')}: {error_message(page_data)}"
+                )
+                break
+            page = page_data.get("data", {}).get("next_items_page") or {}
+
+
+def add_to_listing(listing: dict, group: dict, items: List[dict]) -> None:
+    """Add a page of items to a boards/groups/items_page board listing.
+
+    This is the layout the raw notes files are saved in, for callers that
+    keep the board listing.
+    """
+    boards = listing.setdefault("data", {}).setdefault("boards", [])
+    if not boards:
+        boards.append({"groups": []})
+    groups = boards[0]["groups"]
+    if not groups or groups[-1]["id"] != group.get("id"):
+        groups.append(
+            {
+                "title": group.get("title"),
+                "id": group.get("id"),
+                "items_page": {"cursor": None, "items": []},
+            }
+        )
+    groups[-1]["items_page"]["items"].extend(items)
+
+
+def iter_batches(values: Iterable, batch_size: int) -> Iterator[list]:
+    """Group any iterable into lists of ``batch_size`` without reading it all."""
+    iterator = iter(values)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+# Largest update batch that worked per board, kept between runs
+BATCH_SIZES_PATH = "data/batch_sizes.json"
+batch_sizes_lock = threading.Lock()
+
+
+class AdaptiveBatchSize:
+    """Batch size that halves on complexity errors and grows back on success.
+
+    The largest size that succeeded is saved per board and used as the
+    starting size of the next run.
+    """
+
+    def __init__(
+        self,
+        board_id,
+        initial: int = 25,
+        maximum: int = 100,
+        grow_after: int = 3,
+        path: str = BATCH_SIZES_PATH,
+    ):
+        self.key = str(board_id)
+        self.maximum = maximum
+        self.grow_after = grow_after
+        self.path = path
+        self.largest_ok = 0
+        self.failed_size: Optional[int] = None
+        self.successes = 0
+        self.size = min(maximum, load_batch_sizes(path).get(self.key, initial))
+
+    def succeeded(self, batch_size: int) -> None:
+        self.largest_ok = max(self.largest_ok, batch_size)
+        self.successes += 1
+        if self.successes < self.grow_after:
+            return
+        self.successes = 0
+        grown = min(self.maximum, self.size * 2)
+        if self.failed_size is not None:
+            grown = min(grown, self.failed_size - 1)
+        if grown > self.size:
+            print(f"Growing batch size for board {self.key} to {grown}")
+            self.size = grown
+
+    def failed(self, batch_size: int) -> None:
+        self.successes = 0
+        self.failed_size = batch_size
+        self.size = max(1, batch_size // 2)
+        print(f"Shrinking batch size for board {self.key} to {self.size}")
+
+    def save(self) -> None:
+        """Remember the largest batch size that worked for this board."""
+        if not self.largest_ok:
+            return
+        with batch_sizes_lock:
+            sizes = load_batch_sizes(self.path)
+            sizes[self.key] = self.largest_ok
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(sizes, f, indent=2)
+
+
+def load_batch_sizes(path: str = BATCH_SIZES_PATH) -> Dict[str, int]:
+    """Read the saved batch size of every board, if there is one."""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+board_columns_cache: Dict[str, Dict[str, str]] = {}
+
+
+def board_columns(board_id) -> Dict[str, str]:
+    """Return a board's column ids by title, fetched once per board."""
+    key = str(board_id)
+    if key not in board_columns_cache:
+        query = """
+        query GetColumns($boardId: [ID!]) {
+            boards(ids: $boardId) {
+                columns { id title }
+            }
+        }
+        """
+        response_data, success = run_query(query, {"boardId": [key]})
+        if not success:
+            print(f"Error fetching columns of board {key}: {error_message(response_data)}")
+            return {}
+        board_columns_cache[key] = {
+            column["title"]: column["id"]
+            for board in response_data.get("data", {}).get("boards", [])
+            for column in board.get("columns", [])
+        }
+    return board_columns_cache[key]
+
+
+def date_rule_params(column_id: str, start_date: str, end_date: str) -> dict:
+    """Build items_page query_params keeping items dated within the range.
+
+    Dates are stored in UTC while the pipeline filters on US Central dates,
+    so the range is widened by one day to keep notes that cross midnight UTC.
+    """
+    last_day = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
+    return {
+        "rules": [
+            {
+                "column_id": column_id,
+                "compare_value": [start_date, last_day.strftime("%Y-%m-%d")],
+                "operator": "between",
+            }
+        ]
+    }
@@ -0,0 +1,509 @@
+import hashlib
+import importlib.util
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+
+def copy_json(value: Any) -> Any:
+    """Copy a JSON document; cheaper than copy.deepcopy for plain data."""
+    if isinstance(value, dict):
+        return {key: copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_json(item) for item in value]
+    return value
+
+
+class DataStore:
+    """JSON documents handed from one stage to the next.
+
+    Documents are addressed by the same paths the stages used to read and
+    write. They stay in memory and only reach the disk when checkpointing is
+    on, which it is whenever a stage script is run on its own.
+    """
+
+    def __init__(self, checkpoint: bool = True):
+        self.checkpoint = checkpoint
+        self.documents: Dict[str, Any] = {}
+        # Stages on independent branches use the store at the same time
+        self.lock = threading.Lock()
+
+    def load(self, path: str) -> Any:
+        """Return a private copy of a document, reading the file if needed."""
+        with self.lock:
+            document = self.documents.get(os.path.normpath(path))
+        if document is not None:
+            return copy_json(document)
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, path: str, data: Any, indent: Optional[int] = 4) -> None:
+        """Keep a document for later stages and write it when checkpointing."""
+        with self.lock:
+            self.documents[os.path.normpath(path)] = data
+        if self.checkpoint:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=indent)
+
+    def peek(self, path: str) -> Any:
+        """Return a document without copying it; callers must not change it."""
+        with self.lock:
+            document = self.documents.get(os.path.normpath(path))
+        if document is not None:
+            return document
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def exists(self, path: str) -> bool:
+        with self.lock:
+            if os.path.normpath(path) in self.documents:
+                return True
+        return os.path.exists(path)
+
+    def listdir(self, directory: str) -> List[str]:
+        """List the documents of a directory, in memory and on disk."""
+        prefix = os.path.normpath(directory)
+        with self.lock:
+            names = {
+                os.path.basename(key)
+                for key in self.documents
+                if os.path.dirname(key) == prefix
+            }
+        if os.path.isdir(directory):
+            names.update(
+                name
+                for name in os.listdir(directory)
+                if os.path.isfile(os.path.join(directory, name))
+            )
+        return sorted(names)
+
+    def forget(self, path: str) -> None:
+        """Drop the in-memory documents at or under a path."""
+        prefix = os.path.normpath(path)
+        with self.lock:
+            for key in list(self.documents):
+                if key == prefix or os.path.dirname(key) == prefix:
+                    del self.documents[key]
+
+    def remove(self, path: str) -> None:
+        """Forget a document and delete its file if there is one."""
+        with self.lock:
+            self.documents.pop(os.path.normpath(path), None)
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+store = DataStore(checkpoint=True)
+
+class Stage(NamedTuple):
+    """A pipeline script with the documents it reads and writes.
+
+    Paths name a document or a whole directory of them. Stages with
+    ``cache`` off, like the clean-up and the fetches from monday and
+    OpenPhone, run every time.
+    """
+
+    script: str
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    cache: bool = True
+
+
+INIT = "data/reference/init.json"
+PHONE_DETAILS = "data/reference/phone_details.json"
+RAW_NOTES = "data/notes/raw_notes"
+CLEANED_NOTES = "data/notes/cleaned_notes"
+FILTERED_NOTES = "data/notes/filtered_notes"
+
+# Stages of a full nightly run, in the order they ran one by one
+stages = [
+    # The fetches read live boards, so their inputs never tell a rerun
+    # whether anything was edited since the last snapshot
+    Stage("01_reference_collecter.py", (), (INIT,), cache=False),
+    Stage("02.py", (INIT,), (RAW_NOTES,), cache=False),
+    Stage("03_notes_cleaner.py", (RAW_NOTES,), (CLEANED_NOTES, FILTERED_NOTES)),
+    Stage("04_call_logs_retriever.py", (INIT,), (PHONE_DETAILS,), cache=False),
+    Stage("05_call_ids_retriever.py", (PHONE_DETAILS,), (PHONE_DETAILS, "data/call_logs")),
+    Stage("06_call_logs_ids_combiner.py", (PHONE_DETAILS, "data/call_logs"), (PHONE_DETAILS,)),
+    Stage("07_call_transcript_retriever.py", (PHONE_DETAILS,), (PHONE_DETAILS,)),
+    Stage("08_call_transcript_cleaner.py", (PHONE_DETAILS, INIT), (PHONE_DETAILS,)),
+    Stage("09_calls_notes_combiner.py", (PHONE_DETAILS, FILTERED_NOTES), (FILTERED_NOTES,)),
+    Stage("10_ai_1_transcript_analyzer.py", (FILTERED_NOTES,), ("AI Revised 1",)),
+    Stage("10_ai_2_start.py", ("AI Revised 1",), ("AI Revised 2",)),
+    Stage("10_ai_3_end.py", ("AI Revised 2",), ("AI Revised 3",)),
+    Stage("10_ai_4_service.py", ("AI Revised 3",), ("AI Revised 4",)),
+    Stage("10_ai_5_bills.py", ("AI Revised 4",), ("AI Revised 5",)),
+    Stage("10_ai_6_columns.py", ("AI Revised 5",), ("AI Revised 6",)),
+    Stage("10_ai_parallel.py", (FILTERED_NOTES,), ("AI Revised 2", "AI Revised 6")),
+    Stage("10_ai_fused.py", (FILTERED_NOTES,), ("AI Revised 2", "AI Revised 6")),
+    Stage("10_ai_batch.py", (FILTERED_NOTES,), ("AI Revised 2", "AI Revised 6")),
+    Stage("11_CST_to_UTC.py", ("AI Revised 6",), ("final",)),
+    Stage(
+        "12_1_groups_columns_fetcher.py",
+        (INIT, "final"),
+        (INIT, "Output", "_columns.json", "_groups.json"),
+    ),
+    Stage(
+        "12_2_units.py",
+        (INIT, "AI Revised 2"),
+        (INIT, "Output_units", "_columns_units.json", "_groups_units.json"),
+    ),
+    Stage("13.py", ("Output",), ()),
+    Stage("14_hired_units.py", ("Output_units",), ("Output_units",)),
+    Stage("14_units_monday.py", ("Output_units",), ()),
+    Stage(
+        "remover.py",
+        (),
+        (
+            "AI Revised 1",
+            "AI Revised 2",
+            "AI Revised 3",
+            "AI Revised 4",
+            "AI Revised 5",
+            "AI Revised 6",
+            FILTERED_NOTES,
+            CLEANED_NOTES,
+            "final",
+            "Output",
+            "Output_units",
+            "_columns_units.json",
+            "_groups_units.json",
+            "_columns.json",
+            "_groups.json",
+            "data/reference",
+        ),
+        cache=False,
+    ),
+]
+
+# The six QA passes, chained through AI Revised 1..6 in sequential mode
+AI_PASS_SCRIPTS = [
+    "10_ai_1_transcript_analyzer.py",
+    "10_ai_2_start.py",
+    "10_ai_3_end.py",
+    "10_ai_4_service.py",
+    "10_ai_5_bills.py",
+    "10_ai_6_columns.py",
+]
+
+# Stages that run the QA passes in each QA_AI_MODE
+AI_MODE_SCRIPTS = {
+    "sequential": AI_PASS_SCRIPTS,
+    "parallel": ["10_ai_parallel.py"],
+    "fused": ["10_ai_fused.py"],
+    "batch": ["10_ai_batch.py"],
+}
+
+
+def ai_stage_scripts(ai_mode: Optional[str] = None) -> List[str]:
+    """The stages that run the QA passes, as QA_AI_MODE selects."""
+    ai_mode = ai_mode or os.getenv("QA_AI_MODE", "sequential")
+    if ai_mode not in AI_MODE_SCRIPTS:
+        raise ValueError(
+            f"Unknown QA_AI_MODE {ai_mode!r}; use one of {', '.join(AI_MODE_SCRIPTS)}"
+        )
+    return AI_MODE_SCRIPTS[ai_mode]
+
+
+def pipeline_scripts(ai_mode: Optional[str] = None) -> List[str]:
+    """The stages of a full nightly run, in order."""
+    scripts = []
+    for stage in stages:
+        if stage.script == AI_PASS_SCRIPTS[0]:
+            scripts.extend(ai_stage_scripts(ai_mode))
+        elif not any(stage.script in group for group in AI_MODE_SCRIPTS.values()):
+            scripts.append(stage.script)
+    return scripts
+
+
+scripts = pipeline_scripts("sequential")
+
+# Stages started at once when their branches are independent
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))
+
+
+def paths_overlap(first: str, second: str) -> bool:
+    """Whether two document paths are the same or one contains the other."""
+    first, second = os.path.normpath(first), os.path.normpath(second)
+    return (
+        first == second
+        or first.startswith(second + os.sep)
+        or second.startswith(first + os.sep)
+    )
+
+
+def touches(first: Tuple[str, ...], second: Tuple[str, ...]) -> bool:
+    return any(paths_overlap(a, b) for a in first for b in second)
+
+
+def stage_dependencies(
+    run: List[Stage], barriers: Set[str] = frozenset()
+) -> Dict[str, Set[str]]:
+    """Map every stage to the earlier stages it has to wait for.
+
+    A stage waits for an earlier one when it reads what that stage writes,
+    writes what it writes, or writes what it reads, so the result is the
+    same as running the stages one by one in list order. Barrier stages,
+    whose documents are unknown, wait for and hold back everything.
+    """
+    dependencies = {}
+    for index, stage in enumerate(run):
+        dependencies[stage.script] = {
+            earlier.script
+            for earlier in run[:index]
+            if stage.script in barriers
+            or earlier.script in barriers
+            or touches(earlier.outputs, stage.inputs)
+            or touches(earlier.outputs, stage.outputs)
+            or touches(earlier.inputs, stage.outputs)
+        }
+    return dependencies
+
+
+# Settings that change what a stage produces besides its input documents
+STAGE_PARAMETERS = [
+    "QA_TARGET_DATE",
+    "QA_DAYS_AGO",
+    "NOTES_START_DATE",
+    "NOTES_END_DATE",
+    "QA_RULE_CHECKS",
+]
+
+MANIFEST_DIR = os.getenv("PIPELINE_MANIFEST_DIR", "data/pipeline")
+
+
+def document_digest(data: Any) -> str:
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+
+
+def stage_documents(paths: Tuple[str, ...]) -> List[str]:
+    """Expand document and directory paths into the documents present now."""
+    documents = []
+    for path in paths:
+        names = store.listdir(path)
+        if names:
+            documents.extend(os.path.join(path, name) for name in names)
+        elif store.exists(path) and not os.path.isdir(path):
+            documents.append(path)
+    return sorted(set(os.path.normpath(document) for document in documents))
+
+
+class StageManifest:
+    """What each stage last ran on and a snapshot of what it produced.
+
+    A stage whose script, parameters and input documents hash to the value
+    recorded for it is not run again; its recorded outputs are restored
+    instead, so a run that failed late resumes where it stopped. Snapshots
+    are stored by content hash under ``directory``, outside the folders the
+    clean-up stage empties.
+    """
+
+    def __init__(self, directory: str = MANIFEST_DIR):
+        self.directory = directory
+        self.path = os.path.join(directory, "manifest.json")
+        self.snapshot_dir = os.path.join(directory, "snapshots")
+        self.lock = threading.Lock()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries: Dict[str, dict] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def input_hash(self, stage: Stage) -> str:
+        """Hash the stage script, its parameters and its input documents."""
+        import qa_dates
+
+        digest = hashlib.sha256()
+        with open(stage.script, "rb") as f:
+            digest.update(f.read())
+        parameters = {name: os.getenv(name) for name in STAGE_PARAMETERS}
+        parameters["target_date"] = qa_dates.target_date()
+        digest.update(json.dumps(parameters, sort_keys=True).encode("utf-8"))
+        for document in stage_documents(stage.inputs):
+            digest.update(document.encode("utf-8"))
+            digest.update(document_digest(store.peek(document)).encode("utf-8"))
+        return digest.hexdigest()
+
+    def snapshot_path(self, digest: str) -> str:
+        return os.path.join(self.snapshot_dir, f"{digest}.json")
+
+    def restore(self, stage: Stage, input_hash: str) -> bool:
+        """Put back the outputs of an unchanged stage; False if it must run."""
+        with self.lock:
+            entry = self.entries.get(stage.script)
+        if not entry or entry.get("input_hash") != input_hash:
+            return False
+        outputs = entry.get("outputs", {})
+        if not all(os.path.exists(self.snapshot_path(d)) for d in outputs.values()):
+            return False
+        for document, digest in outputs.items():
+            with open(self.snapshot_path(digest), "r", encoding="utf-8") as f:
+                store.save(document, json.load(f))
+        return True
+
+    def record(self, stage: Stage, input_hash: str) -> None:
+        """Snapshot the outputs of a stage that just succeeded."""
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        outputs = {}
+        for document in stage_documents(stage.outputs):
+            data = store.peek(document)
+            digest = document_digest(data)
+            path = self.snapshot_path(digest)
+            if not os.path.exists(path):
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+            outputs[document] = digest
+
+        with self.lock:
+            self.entries[stage.script] = {
+                "input_hash": input_hash,
+                "outputs": outputs,
+                "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            self.save()
+
+    def save(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(temp_path, self.path)
+
+    def prune(self) -> None:
+        """Delete snapshots no stage refers to any more."""
+        if not os.path.isdir(self.snapshot_dir):
+            return
+        with self.lock:
+            referenced = {
+                f"{digest}.json"
+                for entry in self.entries.values()
+                for digest in entry.get("outputs", {}).values()
+            }
+        for name in os.listdir(self.snapshot_dir):
+            if name not in referenced:
+                os.remove(os.path.join(self.snapshot_dir, name))
+
+
+stage_modules: Dict[str, Any] = {}
+
+
+def load_stage(script: str):
+    """Import a numbered stage script once and reuse it afterwards."""
+    if script not in stage_modules:
+        name = os.path.splitext(os.path.basename(script))[0]
+        spec = importlib.util.spec_from_file_location(f"stage_{name}", script)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        stage_modules[script] = module
+    return stage_modules[script]
+
+
+def run_stage(script: str) -> bool:
+    """Run one stage in this interpreter; report whether it succeeded."""
+    if not os.path.exists(script):
+        print(f"Script not found: {script}")
+        return False
+    try:
+        print(f"Running {script}...")
+        started = time.monotonic()
+        load_stage(script).main()
+        print(f"Completed {script} in {time.monotonic() - started:.1f}s.\n")
+        return True
+    except Exception as e:
+        print(f"Error running {script}: {e}\n")
+        return False
+
+
+def run_cached_stage(stage: Stage, manifest: Optional[StageManifest], fresh: bool) -> bool:
+    """Run a stage unless the manifest shows its inputs have not changed."""
+    if manifest is None or not stage.cache:
+        return run_stage(stage.script)
+
+    input_hash = manifest.input_hash(stage)
+    if not fresh and manifest.restore(stage, input_hash):
+        print(f"Skipping {stage.script}: inputs unchanged since its last run.\n")
+        return True
+    succeeded = run_stage(stage.script)
+    if succeeded:
+        manifest.record(stage, input_hash)
+    return succeeded
+
+
+def run_pipeline(
+    stage_scripts: List[str],
+    checkpoint: Optional[bool] = None,
+    workers: int = PIPELINE_WORKERS,
+    fresh: Optional[bool] = None,
+) -> Dict[str, bool]:
+    """Run the stages as a dependency graph, passing their data in memory.
+
+    Independent branches, such as the call logs (04-08) and the notes
+    (02-03), run at the same time and join at 09. Intermediate files are only
+    written when ``checkpoint`` is true, or PIPELINE_CHECKPOINT=1 is set.
+
+    Stages whose inputs are unchanged since they last succeeded are skipped
+    (see StageManifest) unless ``fresh`` or PIPELINE_FRESH=1 asks to rerun
+    everything. Stages that depend on a failed stage are not run.
+    """
+    if checkpoint is None:
+        checkpoint = os.getenv("PIPELINE_CHECKPOINT") == "1"
+    if fresh is None:
+        fresh = os.getenv("PIPELINE_FRESH") == "1"
+    store.checkpoint = checkpoint
+    manifest = StageManifest()
+
+    declared = {stage.script: stage for stage in stages}
+    run = [declared.get(script, Stage(script)) for script in stage_scripts]
+    dependencies = stage_dependencies(run, barriers=set(stage_scripts) - declared.keys())
+
+    results: Dict[str, bool] = {}
+    pending = [stage.script for stage in run]
+    running = {}
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        while pending or running:
+            for stage in run:
+                script = stage.script
+                if script not in pending or not dependencies[script] <= results.keys():
+                    continue
+                pending.remove(script)
+                failed = [dep for dep in dependencies[script] if not results[dep]]
+                if failed:
+                    # Keeps the clean-up from wiping what a rerun resumes from
+                    print(f"Skipping {script}: {', '.join(sorted(failed))} failed.\n")
+                    results[script] = False
+                    continue
+                future = executor.submit(run_cached_stage, stage, manifest, fresh)
+                running[future] = script
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+
+    manifest.prune()
+    failed = [script for script, ok in results.items() if not ok]
+    print(f"Pipeline finished in {time.monotonic() - started:.1f}s")
+    from qa_ai import dispatcher, model_routes, prompt_stats, response_cache, verdict_store
+
+    if dispatcher.requests:
+        print(dispatcher.summary())
+    if prompt_stats.stages:
+        print(prompt_stats.summary())
+    if response_cache.hits or response_cache.misses:
+        print(response_cache.summary())
+    if verdict_store.reused or verdict_store.analyzed:
+        print(verdict_store.summary())
+    if model_routes.answered or model_routes.escalated:
+        print(model_routes.summary())
+    if failed:
+        print(f"Failed stages: {', '.join(failed)}")
+    return results
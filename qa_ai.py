@@ -0,0 +1,827 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import openai
+from openai.types.chat import ChatCompletion
+
+from pipeline import store
+from qa_rules import note_time
+
+# Completions of unchanged prompts are answered from a local SQLite cache:
+# QA_LLM_CACHE=on (default), refresh (call OpenAI and overwrite) or off
+LLM_CACHE_MODE = os.getenv("QA_LLM_CACHE", "on").lower()
+LLM_CACHE_PATH = os.getenv("QA_LLM_CACHE_PATH", "data/llm_cache.sqlite")
+LLM_CACHE_MAX_BYTES = int(float(os.getenv("QA_LLM_CACHE_MB", "200")) * 1024 * 1024)
+
+# Boards analyzed at once by a stage and requests in flight to OpenAI; the
+# dispatcher keeps them under the rate limits reported by the API
+QA_AI_CONCURRENCY = int(os.getenv("QA_AI_CONCURRENCY", "4"))
+RATE_LIMIT_RETRIES = int(os.getenv("QA_RATE_LIMIT_RETRIES", "6"))
+# Retries of dropped connections, timeouts, 408/409 and 5xx responses
+TRANSIENT_RETRIES = int(os.getenv("QA_TRANSIENT_RETRIES", "3"))
+# Completion tokens reserved per request when it sets no max_tokens
+OUTPUT_TOKEN_ESTIMATE = int(os.getenv("QA_OUTPUT_TOKEN_ESTIMATE", "1500"))
+
+# Boards with more notes, or more tokens of notes and transcripts, than this
+# are split into chunks that are analyzed at the same time
+QA_CHUNK_NOTES = int(os.getenv("QA_CHUNK_NOTES", "25"))
+QA_CHUNK_TOKENS = int(os.getenv("QA_CHUNK_TOKENS", "8000"))
+
+# How the notes are written into the prompts: minified JSON ("json") or an
+# indexed table with one row per note ("table")
+QA_PROMPT_FORMAT = os.getenv("QA_PROMPT_FORMAT", "json").lower()
+
+# Model each stage's requests go to: QA_MODEL unless QA_MODEL_ROUTES names one
+# for the stage or its check, as "billing=gpt-4-0613,start=gpt-4o-mini"
+QA_MODEL = os.getenv("QA_MODEL", "gpt-4o-2024-11-20")
+DEFAULT_MODEL_ROUTES = {"billing": "gpt-4-0613"}
+QA_MODEL_ROUTES = os.getenv("QA_MODEL_ROUTES", "")
+# With a cascade model, notes are analyzed by it first and only the ones it
+# does not mark Good go to the stage's model; empty turns the cascade off
+QA_CASCADE_MODEL = os.getenv("QA_CASCADE_MODEL", "")
+
+# Verdicts of notes whose analyzed fields did not change are reused:
+# QA_VERDICT_STORE=on (default), refresh (analyze every note again) or off
+VERDICT_STORE_MODE = os.getenv("QA_VERDICT_STORE", "on").lower()
+VERDICT_STORE_PATH = os.getenv("QA_VERDICT_STORE_PATH", "data/qa_verdicts.sqlite")
+
+# What the stages' build_description is rendered with to version their prompts
+EMPTY_BOARD = {"notes": []}
+
+
+def merge_note_fields(data: dict, fields_by_index: Optional[Dict[int, Dict[str, Any]]]) -> None:
+    """Copy the fields a QA pass produced onto the notes of a board bundle."""
+    notes = data.get("notes", [])
+    for index, fields in (fields_by_index or {}).items():
+        if 0 <= index < len(notes):
+            notes[index].update(fields)
+
+
+def note_index(note_analysis: dict, count: int) -> Optional[int]:
+    """The note_index a verdict names, if it is one of the ``count`` notes sent.
+
+    Verdicts are keyed by this index rather than their position in the
+    response, so a note the model skipped or merged does not shift the
+    verdicts after it onto the wrong notes.
+    """
+    try:
+        index = int(note_analysis.get("note_index"))
+    except (TypeError, ValueError):
+        return None
+    return index if 0 <= index < count else None
+
+
+def render_notes(notes, fields: Iterable[str]) -> str:
+    """The notes of a prompt with only the fields its check reads.
+
+    Each note is numbered with its note_index, so the model does not have
+    to count. Text that is not a list of notes, like the placeholder the
+    fused analyzer renders the instructions with, is passed through.
+    """
+    if isinstance(notes, str):
+        return notes
+    fields = list(fields)
+    rows = [
+        {"note_index": index, **{field: note.get(field) for field in fields}}
+        for index, note in enumerate(notes)
+    ]
+    if QA_PROMPT_FORMAT == "table":
+        lines = [" | ".join(["note_index"] + fields)]
+        for row in rows:
+            lines.append(
+                " | ".join(json.dumps(value, ensure_ascii=False, default=str) for value in row.values())
+            )
+        return "\n".join(lines)
+    return json.dumps(rows, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class PromptStats:
+    """Prompt sizes and OpenAI token usage of each check, for the run summary.
+
+    ``cached_tokens`` is the part of the prompt OpenAI served from its
+    prefix cache, so its share of ``prompt_tokens`` is the cache hit rate.
+    """
+
+    COUNTERS = ("prompts", "estimated", "calls", "prompt_tokens", "cached_tokens", "completion_tokens")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages: Dict[str, Dict[str, int]] = {}
+
+    def add(self, stage: str, **counts: int) -> None:
+        with self.lock:
+            entry = self.stages.setdefault(stage, dict.fromkeys(self.COUNTERS, 0))
+            for name, count in counts.items():
+                entry[name] += count
+
+    def record(self, stage: str, prompt) -> None:
+        """Count a prompt, given as its text or as chat messages."""
+        if batch_collector.collecting:
+            # Counted when the batch results are read back
+            return
+        if not isinstance(prompt, str):
+            prompt = "".join(message["content"] for message in prompt)
+        self.add(stage, prompts=1, estimated=len(prompt) // 4)
+
+    def record_usage(self, stage: str, usage) -> None:
+        """Count the tokens OpenAI billed for one completion."""
+        if usage is None:
+            return
+        details = usage.prompt_tokens_details
+        self.add(
+            stage,
+            calls=1,
+            prompt_tokens=usage.prompt_tokens,
+            cached_tokens=(details.cached_tokens or 0) if details else 0,
+            completion_tokens=usage.completion_tokens,
+        )
+
+    def summary(self) -> str:
+        lines = ["Prompt tokens by check:"]
+        with self.lock:
+            for stage, entry in self.stages.items():
+                line = f"  {stage}: {entry['estimated']} estimated in {entry['prompts']} prompts"
+                if entry["calls"]:
+                    rate = entry["cached_tokens"] / max(1, entry["prompt_tokens"]) * 100
+                    line += (
+                        f"; OpenAI billed {entry['prompt_tokens']} prompt tokens, "
+                        f"{entry['cached_tokens']} cached ({rate:.0f}%), "
+                        f"{entry['completion_tokens']} completion tokens in {entry['calls']} calls"
+                    )
+                lines.append(line)
+        return "\n".join(lines)
+
+
+prompt_stats = PromptStats()
+
+
+def open_database(path: str, schema: str) -> sqlite3.Connection:
+    """Open an SQLite file shared by the pipeline threads, creating its table."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute(schema)
+    connection.commit()
+    return connection
+
+
+def digest(value: Any) -> str:
+    return hashlib.sha256(
+        json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class ResponseCache:
+    """Chat completions stored by a hash of model, function schema and prompt.
+
+    The least recently used entries are evicted once the stored responses
+    exceed ``max_bytes``.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = None
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            self.connection = open_database(
+                self.path,
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_used REAL NOT NULL)",
+            )
+        return self.connection
+
+    @staticmethod
+    def key(request: dict) -> str:
+        return digest(request)
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            connection = self.connect()
+            row = connection.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            connection.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            connection.commit()
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        with self.lock:
+            connection = self.connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, response, len(response), time.time()),
+            )
+            self.evict(connection)
+            connection.commit()
+
+    def evict(self, connection: sqlite3.Connection) -> None:
+        """Drop the least recently used responses until the cache fits."""
+        total = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = connection.execute(
+            "SELECT key, size FROM responses ORDER BY last_used"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def summary(self) -> str:
+        lookups = self.hits + self.misses
+        rate = f"{self.hits / lookups * 100:.0f}%" if lookups else "n/a"
+        return f"LLM cache: {self.hits} hits, {self.misses} misses ({rate} hit rate)"
+
+
+response_cache = ResponseCache()
+
+
+def text_tokens(value: Any) -> int:
+    """Rough token count of some prompt data, at four characters per token."""
+    return len(json.dumps(value, default=str)) // 4
+
+
+def estimate_tokens(request: dict) -> int:
+    """Rough token cost of a request: its prompt plus the output."""
+    prompt = text_tokens([request.get("messages"), request.get("functions")])
+    return prompt + (request.get("max_tokens") or OUTPUT_TOKEN_ESTIMATE)
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds in a reset header such as "1s", "6m0s" or "20ms"."""
+    if not value:
+        return None
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def retry_delay(headers, attempt: int) -> float:
+    """How long to wait after a 429, preferring what the API asked for."""
+    if headers is not None:
+        if headers.get("retry-after-ms"):
+            try:
+                return float(headers["retry-after-ms"]) / 1000
+            except ValueError:
+                pass
+        for name in ("retry-after", "x-ratelimit-reset-tokens", "x-ratelimit-reset-requests"):
+            delay = parse_duration(headers.get(name))
+            if delay is not None:
+                return delay
+    return min(60, 2 ** attempt)
+
+
+class Dispatcher:
+    """Paces the OpenAI requests of all stages by the live rate-limit headers.
+
+    Every response reports the requests and tokens left in the current
+    window; a request waits only when its estimated tokens would not fit,
+    until the window resets. A 429 pauses every request for its retry-after.
+    """
+
+    def __init__(self, concurrency: int = QA_AI_CONCURRENCY):
+        self.slots = threading.Semaphore(max(1, concurrency))
+        self.lock = threading.Lock()
+        self.remaining_requests = None
+        self.remaining_tokens = None
+        self.requests_reset_at = 0.0
+        self.tokens_reset_at = 0.0
+        self.paused_until = 0.0
+        self.requests = 0
+        self.rate_limited = 0
+        self.waited = 0.0
+
+    def acquire(self, tokens: int) -> None:
+        """Wait until the current window has room for ``tokens`` and reserve them."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if self.remaining_requests is not None and now >= self.requests_reset_at:
+                    self.remaining_requests = None
+                if self.remaining_tokens is not None and now >= self.tokens_reset_at:
+                    self.remaining_tokens = None
+
+                waits = []
+                if now < self.paused_until:
+                    waits.append(self.paused_until - now)
+                if self.remaining_requests is not None and self.remaining_requests < 1:
+                    waits.append(self.requests_reset_at - now)
+                if self.remaining_tokens is not None and self.remaining_tokens < tokens:
+                    waits.append(self.tokens_reset_at - now)
+                if not waits:
+                    if self.remaining_requests is not None:
+                        self.remaining_requests -= 1
+                    if self.remaining_tokens is not None:
+                        self.remaining_tokens -= tokens
+                    self.requests += 1
+                    return
+                wait = min(max(waits), 5.0)
+                self.waited += wait
+            time.sleep(wait)
+
+    def update(self, headers) -> None:
+        """Take the window left over from the headers of a response."""
+        now = time.monotonic()
+        with self.lock:
+            for name, attribute, reset in (
+                ("requests", "remaining_requests", "requests_reset_at"),
+                ("tokens", "remaining_tokens", "tokens_reset_at"),
+            ):
+                remaining = headers.get(f"x-ratelimit-remaining-{name}")
+                if remaining is None:
+                    continue
+                try:
+                    setattr(self, attribute, int(remaining))
+                except ValueError:
+                    continue
+                delay = parse_duration(headers.get(f"x-ratelimit-reset-{name}"))
+                setattr(self, reset, now + (delay if delay is not None else 1.0))
+
+    def backoff(self, delay: float) -> None:
+        with self.lock:
+            self.rate_limited += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
+    def send(self, client, request: dict) -> ChatCompletion:
+        """client.chat.completions.create, paced and retried on 429s.
+
+        The SDK's own retries are off so 429s can pause every request; the
+        transient failures it would retry are retried here with backoff.
+        """
+        tokens = estimate_tokens(request)
+        raw_client = client.with_options(max_retries=0)
+        rate_limited = transient = 0
+        while True:
+            with self.slots:
+                self.acquire(tokens)
+                try:
+                    raw = raw_client.chat.completions.with_raw_response.create(**request)
+                except openai.RateLimitError as e:
+                    # An exhausted quota does not recover by waiting
+                    if e.code == "insufficient_quota" or rate_limited == RATE_LIMIT_RETRIES:
+                        raise
+                    delay = retry_delay(e.response.headers, rate_limited)
+                    rate_limited += 1
+                    print(f"Rate limited by OpenAI, retrying in {delay:.1f}s")
+                    self.backoff(delay)
+                    continue
+                except (openai.APIConnectionError, openai.APIStatusError) as e:
+                    status = getattr(e, "status_code", None)
+                    retryable = status is None or status in (408, 409) or status >= 500
+                    if not retryable or transient == TRANSIENT_RETRIES:
+                        raise
+                    delay = min(8.0, 0.5 * 2 ** transient)
+                    transient += 1
+                    print(f"OpenAI request failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                else:
+                    self.update(raw.headers)
+                    return raw.parse()
+            # Waited outside the slot so other requests keep going
+            time.sleep(delay)
+
+    def summary(self) -> str:
+        return (
+            f"OpenAI dispatcher: {self.requests} requests, {self.rate_limited} rate limited, "
+            f"{self.waited:.1f}s waiting for the rate limit"
+        )
+
+
+dispatcher = Dispatcher()
+
+
+def analyze_files(
+    analyze_board: Callable[[dict], Any], input_folder: str, filenames: List[str]
+) -> List[Future]:
+    """Load and analyze the bundles of a stage at once, instead of one by one.
+
+    Returns a future of (data, fields) per file, in order; the dispatcher
+    decides how fast their requests actually go out.
+    """
+
+    def load_and_analyze(filename):
+        data = store.load(os.path.join(input_folder, filename))
+        return data, analyze_board(data)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, QA_AI_CONCURRENCY))
+    futures = [executor.submit(load_and_analyze, filename) for filename in filenames]
+    executor.shutdown(wait=False)
+    return futures
+
+
+class BatchRequestQueued(BaseException):
+    """Raised instead of sending a request while a batch is being collected.
+
+    A BaseException so that the ``except Exception`` fallbacks of the
+    analyze_issue functions let it through instead of returning no verdicts.
+    """
+
+
+class BatchCollector:
+    """The requests the QA passes would send, gathered for the Batch API.
+
+    While ``collecting``, create_completion queues its request here and
+    raises BatchRequestQueued. Once the batch is done, its responses are put
+    in ``results`` by request key and the same passes run again against them.
+    """
+
+    def __init__(self):
+        self.collecting = False
+        self.requests: Dict[str, dict] = {}
+        self.results: Dict[str, str] = {}
+        self.lock = threading.Lock()
+
+    def add(self, key: str, request: dict) -> None:
+        with self.lock:
+            self.requests[key] = request
+
+    def result(self, key: str) -> Optional[str]:
+        with self.lock:
+            return self.results.get(key)
+
+
+batch_collector = BatchCollector()
+
+
+def parse_routes(value: str) -> Dict[str, str]:
+    """QA_MODEL_ROUTES as a dict of stage to model."""
+    routes = {}
+    for entry in value.split(","):
+        stage, _, model = entry.partition("=")
+        if stage.strip() and model.strip():
+            routes[stage.strip()] = model.strip()
+    return routes
+
+
+class ModelRoutes:
+    """The model that answers each stage, and the cascade model in front of them.
+
+    A stage without a route of its own takes the route of its check
+    ("billing_rewrite" that of "billing"), then QA_MODEL. Requests sent
+    while a thread runs the cascade tier go to the cascade model instead.
+    """
+
+    def __init__(self, routes: Dict[str, str], default: str = QA_MODEL, cascade: str = QA_CASCADE_MODEL):
+        self.routes = routes
+        self.default = default
+        self.cascade = cascade
+        self.tier = threading.local()
+        self.answered = 0
+        self.escalated = 0
+        self.lock = threading.Lock()
+
+    def model(self, stage: Optional[str]) -> str:
+        if self.in_cascade():
+            return self.cascade
+        stage = stage or ""
+        return self.routes.get(stage) or self.routes.get(stage.split("_")[0]) or self.default
+
+    def in_cascade(self) -> bool:
+        return getattr(self.tier, "cascade", False)
+
+    def cascades(self, stage: str) -> bool:
+        return bool(self.cascade) and self.model(stage) != self.cascade
+
+    def on_cascade(self, analyze: Callable[[dict], Any]) -> Callable[[dict], Any]:
+        """``analyze`` with the requests it sends going to the cascade model."""
+
+        def analyze_on_cascade(data):
+            self.tier.cascade = True
+            try:
+                return analyze(data)
+            finally:
+                self.tier.cascade = False
+
+        return analyze_on_cascade
+
+    def summary(self) -> str:
+        total = self.answered + self.escalated
+        return (
+            f"Cascade on {self.cascade}: {self.answered} of {total} notes answered, "
+            f"{self.escalated} escalated"
+        )
+
+
+model_routes = ModelRoutes({**DEFAULT_MODEL_ROUTES, **parse_routes(QA_MODEL_ROUTES)})
+
+
+def create_completion(client, stage: Optional[str] = None, **request) -> ChatCompletion:
+    """client.chat.completions.create, answered from the cache when possible.
+
+    Every analyze_issue goes through here, so reruns and backfills over the
+    same notes do not pay for the same prompt twice. The model is the one
+    routed to ``stage``, and the usage of responses that come from OpenAI is
+    counted under it.
+    """
+    request.setdefault("model", model_routes.model(stage))
+    stage = stage or request["model"]
+    if model_routes.in_cascade():
+        stage = f"{stage}_cascade"
+    key = ResponseCache.key(request)
+    batched = batch_collector.result(key)
+    if batched is not None:
+        response = ChatCompletion.model_validate_json(batched)
+        prompt_stats.record_usage(stage, response.usage)
+        return response
+
+    if LLM_CACHE_MODE not in ("off", "refresh"):
+        cached = response_cache.get(key)
+        if cached is not None:
+            return ChatCompletion.model_validate_json(cached)
+
+    if batch_collector.collecting:
+        batch_collector.add(key, request)
+        raise BatchRequestQueued(key)
+    response = dispatcher.send(client, request)
+    prompt_stats.record_usage(stage, response.usage)
+    if LLM_CACHE_MODE != "off":
+        response_cache.put(key, response.model_dump_json())
+    return response
+
+
+def chunk_notes(
+    notes: List[dict],
+    max_tokens: int = QA_CHUNK_TOKENS,
+    max_notes: int = QA_CHUNK_NOTES,
+    fields: Optional[Iterable[str]] = None,
+) -> List[List[int]]:
+    """Split the note indexes of a board into chunks of bounded size.
+
+    Notes are taken in Start Time order so each chunk covers a stretch of the
+    day. A note costs the tokens of the ``fields`` the prompt renders, which
+    include the calls attached to it for the transcript check.
+    """
+    fields = list(fields) if fields is not None else None
+
+    def note_tokens(note):
+        if fields is None:
+            return text_tokens(note)
+        return text_tokens({field: note.get(field) for field in fields})
+
+    costs = [note_tokens(note) for note in notes]
+    if len(notes) <= max_notes and sum(costs) <= max_tokens:
+        return [list(range(len(notes)))]
+
+    def start(index):
+        moment = note_time(notes[index], "start_time")
+        return (moment is None, moment or datetime.min)
+
+    chunks, chunk, tokens = [], [], 0
+    for index in sorted(range(len(notes)), key=start):
+        cost = costs[index]
+        if chunk and (len(chunk) >= max_notes or tokens + cost > max_tokens):
+            chunks.append(chunk)
+            chunk, tokens = [], 0
+        chunk.append(index)
+        tokens += cost
+    chunks.append(chunk)
+    return chunks
+
+
+def analyze_in_chunks(
+    analyze: Callable[[dict], Optional[Dict[int, Dict[str, Any]]]],
+    data: dict,
+    max_tokens: Optional[int] = None,
+    fields: Optional[Iterable[str]] = None,
+) -> Optional[Dict[int, Dict[str, Any]]]:
+    """Run ``analyze`` on a board, in concurrent chunks when it is too big.
+
+    The verdicts of the chunks are mapped back to the note indexes of the
+    board.
+    """
+    notes = data.get("notes", [])
+    chunks = chunk_notes(notes, max_tokens or QA_CHUNK_TOKENS, fields=fields)
+    if len(chunks) <= 1:
+        return analyze(data)
+
+    bundles = [{**data, "notes": [notes[index] for index in chunk]} for chunk in chunks]
+    print(f"Split {len(notes)} notes into {len(chunks)} chunks")
+    with ThreadPoolExecutor(max_workers=max(1, min(len(chunks), QA_AI_CONCURRENCY))) as executor:
+        futures = [executor.submit(analyze, bundle) for bundle in bundles]
+
+    fields, errors, queued = None, [], None
+    for chunk, future in zip(chunks, futures):
+        try:
+            analyzed = future.result()
+        except BatchRequestQueued as e:
+            # Every chunk's request is queued before the batch goes out
+            queued = e
+            continue
+        except Exception as e:
+            print(f"Error analyzing a chunk of {len(chunk)} notes: {str(e)}")
+            errors.append(e)
+            continue
+        if analyzed is None:
+            continue
+        fields = fields or {}
+        for local_index, note_verdict in analyzed.items():
+            if 0 <= local_index < len(chunk):
+                fields[chunk[local_index]] = note_verdict
+    if queued is not None:
+        raise queued
+    if fields is None and errors:
+        raise errors[0]
+    return fields
+
+
+def passes_cascade(verdict: Dict[str, Any]) -> bool:
+    """Whether a cascade verdict stands: it has severities and all are Good."""
+    severities = [value for field, value in verdict.items() if field.endswith("_severity")]
+    return bool(severities) and all(str(value).lower() == "good" for value in severities)
+
+
+def analyze_with_cascade(
+    stage: str,
+    analyze: Callable[[dict], Optional[Dict[int, Dict[str, Any]]]],
+    data: dict,
+    max_tokens: Optional[int] = None,
+    fields: Optional[Iterable[str]] = None,
+) -> Optional[Dict[int, Dict[str, Any]]]:
+    """analyze_in_chunks, on the cascade model first when one is set.
+
+    The notes the cascade model marks Good keep its verdict. The ones it
+    flags or gives no clear verdict for are analyzed again on the stage's
+    model, as they would have been without the cascade.
+    """
+    if not model_routes.cascades(stage):
+        return analyze_in_chunks(analyze, data, max_tokens, fields)
+
+    notes = data.get("notes", [])
+    try:
+        first = analyze_in_chunks(model_routes.on_cascade(analyze), data, max_tokens, fields)
+    except Exception as e:
+        print(f"Error in the {stage} cascade, escalating every note: {str(e)}")
+        first = None
+    verdicts = {
+        index: verdict
+        for index, verdict in (first or {}).items()
+        if 0 <= index < len(notes) and passes_cascade(verdict)
+    }
+    escalated = [index for index in range(len(notes)) if index not in verdicts]
+    with model_routes.lock:
+        model_routes.answered += len(verdicts)
+        model_routes.escalated += len(escalated)
+    if not escalated:
+        return verdicts
+
+    analyzed = analyze_in_chunks(
+        analyze,
+        {**data, "notes": [notes[index] for index in escalated]},
+        max_tokens,
+        fields,
+    )
+    if analyzed is None and not verdicts:
+        return None
+    for local_index, verdict in (analyzed or {}).items():
+        if 0 <= local_index < len(escalated):
+            verdicts[escalated[local_index]] = verdict
+    return verdicts
+
+
+class VerdictStore:
+    """The last verdict of every note per QA stage, with a hash of its input.
+
+    The hash covers the note fields the stage analyzes, including the calls
+    attached to the note for 10_ai_1, the stage's prompt and the models that
+    answer it, so an edited note, a new call, a reworded prompt or another
+    model all analyze the note again.
+    """
+
+    def __init__(self, path: str = VERDICT_STORE_PATH):
+        self.path = path
+        self.reused = 0
+        self.analyzed = 0
+        self.lock = threading.Lock()
+        self.connection = None
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            self.connection = open_database(
+                self.path,
+                "CREATE TABLE IF NOT EXISTS verdicts ("
+                "stage TEXT NOT NULL, item_id TEXT NOT NULL, digest TEXT NOT NULL, "
+                "fields TEXT NOT NULL, updated REAL NOT NULL, "
+                "PRIMARY KEY (stage, item_id))",
+            )
+        return self.connection
+
+    def get(self, stage: str, item_id: str, key: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.connect().execute(
+                "SELECT fields FROM verdicts WHERE stage = ? AND item_id = ? AND digest = ?",
+                (stage, item_id, key),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, stage: str, item_id: str, key: str, fields: Dict[str, Any]) -> None:
+        with self.lock:
+            connection = self.connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?)",
+                (stage, item_id, key, json.dumps(fields), time.time()),
+            )
+            connection.commit()
+
+    def summary(self) -> str:
+        return f"QA verdicts: {self.reused} notes reused, {self.analyzed} analyzed"
+
+
+verdict_store = VerdictStore()
+
+
+def analyze_changed_notes(
+    stage: str,
+    data: dict,
+    note_fields: Iterable[str],
+    analyze: Callable[[dict], Optional[Dict[int, Dict[str, Any]]]],
+    prompt: str = "",
+    max_tokens: Optional[int] = None,
+    cascade: bool = True,
+) -> Optional[Dict[int, Dict[str, Any]]]:
+    """Run ``analyze`` only on the notes of a board that changed since the last run.
+
+    ``analyze`` takes a board bundle and returns fields by note index, like
+    analyze_board. It gets a bundle holding just the new or edited notes, in
+    chunks if there are many, and its indexes are mapped back; stored
+    verdicts are returned for the rest. Stages whose verdicts carry no
+    severity, like the billing rewrites, pass ``cascade=False``.
+    """
+
+    def run(bundle):
+        if cascade:
+            return analyze_with_cascade(stage, analyze, bundle, max_tokens, note_fields)
+        return analyze_in_chunks(analyze, bundle, max_tokens, note_fields)
+
+    notes = data.get("notes", [])
+    if VERDICT_STORE_MODE == "off" or not notes:
+        return run(data)
+
+    # A verdict is only reused from the same model, and the same cascade
+    # in front of it
+    models = [
+        model_routes.model(stage),
+        model_routes.cascade if cascade and model_routes.cascades(stage) else None,
+    ]
+    fields, changed, keys = {}, [], {}
+    for index, note in enumerate(notes):
+        item_id = note.get("item_id")
+        if item_id is None:
+            changed.append(index)
+            continue
+        keys[index] = digest(
+            [prompt, models, {field: note.get(field) for field in note_fields}]
+        )
+        stored = None
+        if VERDICT_STORE_MODE != "refresh":
+            stored = verdict_store.get(stage, str(item_id), keys[index])
+        if stored is None:
+            changed.append(index)
+        else:
+            fields[index] = stored
+
+    with verdict_store.lock:
+        verdict_store.reused += len(fields)
+    if not changed:
+        return fields
+
+    analyzed = run({**data, "notes": [notes[index] for index in changed]})
+    if analyzed is None and not fields:
+        return None
+    for local_index, note_verdict in (analyzed or {}).items():
+        if not 0 <= local_index < len(changed):
+            continue
+        index = changed[local_index]
+        fields[index] = note_verdict
+        with verdict_store.lock:
+            verdict_store.analyzed += 1
+        if index in keys:
+            verdict_store.put(stage, str(notes[index]["item_id"]), keys[index], note_verdict)
+    return fields
@@ -0,0 +1,93 @@
+import os
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+import pytz
+from dateutil.parser import parse
+
+from qa_rules import note_time
+
+# How far a call may be from a note's Start/End Time to belong to it
+CALL_WINDOW_MINUTES = int(os.getenv("QA_CALL_WINDOW_MINUTES", "60"))
+CALL_WINDOW = timedelta(minutes=CALL_WINDOW_MINUTES)
+
+cst = pytz.timezone("America/Chicago")
+
+
+def call_time(call: dict, key: str) -> Optional[datetime]:
+    """A call's "Start Time" or "End Time" as naive CST, like the note times."""
+    value = call.get(key)
+    if not value:
+        return None
+    try:
+        moment = parse(value)
+    except (ValueError, OverflowError):
+        return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(cst).replace(tzinfo=None)
+    return moment
+
+
+def call_interval(call: dict) -> Tuple[Optional[datetime], Optional[datetime]]:
+    start = call_time(call, "Start Time")
+    end = call_time(call, "End Time") or start
+    start = start or end
+    if start is not None and end < start:
+        end = start
+    return start, end
+
+
+def note_interval(note: dict) -> Tuple[Optional[datetime], Optional[datetime]]:
+    start = note_time(note, "start_time")
+    end = note_time(note, "end_time") or start
+    return start or end, end
+
+
+class CallIndex:
+    """The calls of one staff member's day sorted by start, for window lookups.
+
+    A lookup bisects to the calls that start before the window ends and no
+    earlier than the longest call could still reach into it, so it only
+    looks at the calls around the note instead of the whole day.
+    """
+
+    def __init__(self, calls: List[dict]):
+        timed = []
+        for call in calls:
+            start, end = call_interval(call)
+            if start is not None:
+                timed.append((start, end, call))
+        timed.sort(key=lambda entry: entry[0])
+        self.entries = timed
+        self.starts = [start for start, _, _ in timed]
+        self.longest = max((end - start for start, end, _ in timed), default=timedelta(0))
+
+    def near(self, start: datetime, end: datetime, window: timedelta = CALL_WINDOW) -> List[dict]:
+        """The calls that overlap ``start``..``end`` widened by ``window``."""
+        low = bisect_left(self.starts, start - window - self.longest)
+        high = bisect_right(self.starts, end + window)
+        return [
+            call
+            for _, call_end, call in self.entries[low:high]
+            if call_end >= start - window
+        ]
+
+
+def attach_calls(data: dict, window: timedelta = CALL_WINDOW) -> dict:
+    """A copy of a board bundle where each note carries only its nearby calls.
+
+    The calls are moved from the bundle's "call_transcripts" into the
+    "call_transcripts" of every note within ``window`` of them. A note
+    without times keeps every call of the day, as the model saw them before.
+    """
+    calls = data.get("call_transcripts") or []
+    index = CallIndex(calls)
+    notes = []
+    for note in data.get("notes", []):
+        start, end = note_interval(note)
+        near = list(calls) if start is None else index.near(start, end, window)
+        notes.append({**note, "call_transcripts": near})
+    bundle = {key: value for key, value in data.items() if key != "call_transcripts"}
+    bundle["notes"] = notes
+    return bundle
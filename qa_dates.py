@@ -0,0 +1,37 @@
+import os
+from datetime import datetime, timedelta
+from typing import List
+from pytz import timezone
+
+
+def validate_date(value: str) -> str:
+    """Check a date is in YYYY-MM-DD format and return it."""
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError("target_date must be in YYYY-MM-DD format")
+    return value
+
+
+def target_date() -> str:
+    """Return the US Central day a QA run checks.
+
+    QA_TARGET_DATE (YYYY-MM-DD) wins; otherwise the day QA_DAYS_AGO days
+    before today, yesterday by default.
+    """
+    value = os.getenv("QA_TARGET_DATE")
+    if value:
+        return validate_date(value)
+    cst = timezone("US/Central")
+    days_ago = int(os.getenv("QA_DAYS_AGO", "1"))
+    return (datetime.now(cst) - timedelta(days=days_ago)).strftime("%Y-%m-%d")
+
+
+def date_range(start_date: str, end_date: str) -> List[str]:
+    """List every day from start_date to end_date, both included."""
+    start = datetime.strptime(validate_date(start_date), "%Y-%m-%d")
+    end = datetime.strptime(validate_date(end_date), "%Y-%m-%d")
+    return [
+        (start + timedelta(days=offset)).strftime("%Y-%m-%d")
+        for offset in range((end - start).days + 1)
+    ]
@@ -0,0 +1,160 @@
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+# Compute the start, end and columns verdicts locally instead of asking
+# OpenAI; QA_RULE_CHECKS=0 goes back to the prompts in 10_ai_2/3/6
+RULE_CHECKS = os.getenv("QA_RULE_CHECKS", "1") != "0"
+RULE_PREFIXES = ("start", "end", "columns")
+
+# How long before the Start/End Time the session/update may be created
+MAX_LEAD = timedelta(minutes=20)
+
+# Columns 10_ai_6 requires, with the names used in its reasons
+REQUIRED_COLUMNS = [
+    ("start_time", "Start Time"),
+    ("end_time", "End Time"),
+    ("manual_units", "Units"),
+    ("service_type", "Service Type"),
+    ("provided_as", "Provided As"),
+    ("service_line", "Service Line"),
+    ("session_status", "Session Status"),
+]
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Parse a CST "YYYY-MM-DD HH:MM:SS" timestamp from the notes cleaner."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def note_time(note: dict, key: str) -> Optional[datetime]:
+    """Combine the note date with one of its HH:MM:SS times."""
+    if not note.get("date") or not note.get(key):
+        return None
+    moment = parse_datetime(f"{note['date']} {note[key]}")
+    # A session that ends past midnight keeps the date it started on
+    if moment and key == "end_time":
+        start = parse_datetime(f"{note['date']} {note.get('start_time')}")
+        if start and moment < start:
+            moment += timedelta(days=1)
+    return moment
+
+
+def clock(moment: datetime) -> str:
+    return moment.strftime("%I:%M %p")
+
+
+def duration(delta: timedelta) -> str:
+    """Describe a gap the way the QA reasons do, e.g. "2 hours and 5 minutes (02:05)"."""
+    minutes = int(abs(delta.total_seconds()) // 60)
+    hours, rest = divmod(minutes, 60)
+    parts = []
+    if hours:
+        parts.append(f"{hours} hour{'s' if hours != 1 else ''}")
+    if rest or not hours:
+        parts.append(f"{rest} minute{'s' if rest != 1 else ''}")
+    return f"{' and '.join(parts)} ({hours:02d}:{rest:02d})"
+
+
+def time_verdict(
+    created: Optional[datetime],
+    scheduled: Optional[datetime],
+    created_name: str,
+    scheduled_name: str,
+) -> Tuple[str, str]:
+    """Check something was created before a note time, by less than 20 minutes."""
+    if scheduled is None:
+        return "Flagged", f"The {scheduled_name} is not provided, so the note is marked as Flagged."
+    if created is None:
+        return "Flagged", f"The {created_name} is not available, so the note is marked as Flagged."
+
+    lead = scheduled - created
+    times = (
+        f"The {created_name} was {clock(created)}, "
+        f"and the {scheduled_name} was {clock(scheduled)}."
+    )
+    if lead < timedelta(0):
+        return "Flagged", (
+            f"The {created_name} was {duration(lead)} after the {scheduled_name}. {times} "
+            f"Because the {created_name} was after the {scheduled_name}, the note is marked "
+            f"as Flagged. The {created_name} should be before the {scheduled_name} within 20 minutes."
+        )
+    if lead >= MAX_LEAD:
+        return "Flagged", (
+            f"The {created_name} was {duration(lead)} before the {scheduled_name}. {times} "
+            f"Hence, the note is marked as Flagged due to the significant discrepancy. The "
+            f"{created_name} should be before the {scheduled_name} within 20 minutes."
+        )
+    return "Good", (
+        f"The {created_name} was {duration(lead)} before the {scheduled_name}. {times} "
+        f"Because the {created_name} was before the {scheduled_name} within 20 minutes, "
+        f"the note is marked as Good."
+    )
+
+
+def start_verdict(note: dict) -> Tuple[str, str]:
+    """Session Creation Time against Start Time, as 10_ai_2 asks for."""
+    return time_verdict(
+        parse_datetime(note.get("session_creation_time")),
+        note_time(note, "start_time"),
+        "Session Creation Time",
+        "Start Time",
+    )
+
+
+def end_verdict(note: dict) -> Tuple[str, str]:
+    """Update Creation Time against End Time, as 10_ai_3 asks for."""
+    return time_verdict(
+        parse_datetime(note.get("update_creation_time")),
+        note_time(note, "end_time"),
+        "Update Creation Time",
+        "End Time",
+    )
+
+
+def in_progress(status: str) -> bool:
+    return status.lower().replace("-", " ").replace("_", " ").split() == ["in", "progress"]
+
+
+def columns_verdict(note: dict) -> Tuple[str, str]:
+    """Flag notes with an empty required column or an unfinished session."""
+    missing = [
+        title
+        for key, title in REQUIRED_COLUMNS
+        if note.get(key) is None or str(note.get(key)).strip() in ("", '""')
+    ]
+    status = note.get("session_status")
+    problems = []
+    if missing:
+        problems.append(
+            f"The following columns are not filled: {', '.join(missing)}."
+        )
+    if status and in_progress(str(status)):
+        problems.append(f"The Session Status is {status}, not completed.")
+    if problems:
+        return "Flagged", " ".join(problems) + " Therefore, the note is marked as Flagged."
+    return "Good", "All the columns are filled, therefore the note is marked as good."
+
+
+CHECKS = {
+    "start": start_verdict,
+    "end": end_verdict,
+    "columns": columns_verdict,
+}
+
+
+def rule_fields(notes, prefixes=RULE_PREFIXES) -> Dict[int, Dict[str, str]]:
+    """Return the rule verdicts of every note by note index."""
+    fields = {}
+    for index, note in enumerate(notes):
+        fields[index] = {}
+        for prefix in prefixes:
+            severity, reason = CHECKS[prefix](note)
+            fields[index][f"{prefix}_severity"] = severity
+            fields[index][f"{prefix}_reason"] = reason
+    return fields
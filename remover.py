@@ -1,8 +1,10 @@
 import os
+from pipeline import store
 
 
 def delete_files_in_dirs(paths):
     for path in paths:
+        store.forget(path)
         if os.path.exists(path):
             if os.path.isdir(path):
                 # Handle directory
@@ -25,17 +27,15 @@ def delete_files_in_dirs(paths):
             print(f"Path not found: {path}")
 
 
-# List of directories and files to delete
-dirs_to_clean = [
+# Outputs of a single QA day, rebuilt by every run of the day stages
+day_outputs = [
     "AI Revised 1",
     "AI Revised 2",
     "AI Revised 3",
     "AI Revised 4",
     "AI Revised 5",
     "AI Revised 6",
-    "data/notes/cleaned_notes",
     "data/notes/filtered_notes",
-    "data/reference",
     "final",
     "Output",
     "Output_units",
@@ -45,5 +45,15 @@ dirs_to_clean = [
     "_groups.json",
 ]
 
-# Call the function
-delete_files_in_dirs(dirs_to_clean)
+# List of directories and files to delete
+dirs_to_clean = day_outputs + [
+    "data/notes/cleaned_notes",
+    "data/reference",
+]
+
+def main():
+    delete_files_in_dirs(dirs_to_clean)
+
+
+if __name__ == "__main__":
+    main()
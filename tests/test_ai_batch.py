@@ -0,0 +1,275 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Read when qa_ai is imported: nothing is cached, so every answer comes
+# from the fake batch endpoints or the synchronous fallback
+os.environ.update(
+    OPEN_AI_API="test",
+    QA_LLM_CACHE="off",
+    QA_VERDICT_STORE="off",
+    QA_BILLING_MODE="split",
+    QA_RULE_CHECKS="1",
+)
+os.environ.pop("QA_CASCADE_MODEL", None)
+
+from openai.types.chat import ChatCompletion  # noqa: E402
+
+import qa_ai  # noqa: E402
+from pipeline import load_stage, store  # noqa: E402
+
+NOTES_MARKER = "**Session Notes**: "
+
+
+def prompt_notes(request):
+    """The rendered notes of a request, from its last Session Notes block."""
+    text = "".join(message["content"] for message in request["messages"])
+    start = text.rindex(NOTES_MARKER) + len(NOTES_MARKER)
+    notes, _ = json.JSONDecoder().raw_decode(text[start:])
+    return notes
+
+
+def completion(request):
+    """A chat completion answering the function call of a QA request.
+
+    Every string field names the note it is about, so a verdict that lands
+    on the wrong note is visible. Notes with more than 4 manual units are
+    overbilled.
+    """
+    function = request["functions"][0]
+    key, schema = next(iter(function["parameters"]["properties"].items()))
+    properties = schema["items"]["properties"]
+    verdicts = []
+    for note in prompt_notes(request):
+        verdict = {}
+        for name, spec in properties.items():
+            if name == "note_index":
+                verdict[name] = note["note_index"]
+            elif "overbilled" in spec.get("enum", []):
+                verdict[name] = "overbilled" if int(note["manual_units"]) > 4 else "good"
+            elif "enum" in spec:
+                verdict[name] = spec["enum"][0]
+            else:
+                verdict[name] = f"{name} of {note['update_text_body']}"
+        verdicts.append(verdict)
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": request["model"],
+        "choices": [
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {
+                    "role": "assistant",
+                    "content": None,
+                    "function_call": {
+                        "name": function["name"],
+                        "arguments": json.dumps({key: verdicts}),
+                    },
+                },
+            }
+        ],
+    }
+
+
+class FakeOpenAI:
+    """The files and batches endpoints of the Batch API, answered locally.
+
+    A batch is answered as soon as it is created. The first ``failures``
+    requests of every batch fail, and the output lines come back in reverse
+    order so they can only be matched by custom_id.
+    """
+
+    def __init__(self, status="completed", failures=0, polls=0):
+        self.status = status
+        self.failures = failures
+        self.polls = polls
+        self.uploads = {}
+        self.batches_created = []
+        self.batch_objects = {}
+        self.files = SimpleNamespace(create=self.create_file, content=self.file_content)
+        self.batches = SimpleNamespace(create=self.create_batch, retrieve=self.retrieve_batch)
+
+    def create_file(self, file, purpose):
+        assert purpose == "batch"
+        file_id = f"file-{len(self.uploads)}"
+        self.uploads[file_id] = file.read().decode("utf-8")
+        return SimpleNamespace(id=file_id)
+
+    def file_content(self, file_id):
+        return SimpleNamespace(text=self.uploads[file_id])
+
+    def create_batch(self, input_file_id, endpoint, completion_window):
+        lines = [json.loads(line) for line in self.uploads[input_file_id].splitlines()]
+        self.batches_created.append(lines)
+        output = []
+        for number, line in enumerate(lines):
+            if number < self.failures:
+                response = {"status_code": 500, "body": {"error": {"message": "server error"}}}
+            else:
+                response = {"status_code": 200, "body": completion(line["body"])}
+            output.append({"custom_id": line["custom_id"], "response": response})
+        output_id = f"file-{len(self.uploads)}"
+        self.uploads[output_id] = "\n".join(json.dumps(entry) for entry in reversed(output))
+
+        batch_id = f"batch-{len(self.batches_created)}"
+        self.batch_objects[batch_id] = {"output_file_id": output_id, "polls": self.polls}
+        return SimpleNamespace(id=batch_id)
+
+    def retrieve_batch(self, batch_id):
+        state = self.batch_objects[batch_id]
+        if state["polls"]:
+            state["polls"] -= 1
+            return SimpleNamespace(id=batch_id, status="in_progress", request_counts=None, output_file_id=None)
+        return SimpleNamespace(
+            id=batch_id,
+            status=self.status,
+            request_counts=None,
+            output_file_id=state["output_file_id"],
+        )
+
+
+class BatchModeTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.previous_cwd = os.getcwd()
+        # The stages are loaded by their paths relative to the repository
+        os.chdir(ROOT)
+        cls.batch = load_stage("10_ai_batch.py")
+
+    @classmethod
+    def tearDownClass(cls):
+        os.chdir(cls.previous_cwd)
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_folder = os.path.join(self.tmp.name, "filtered")
+        self.output_folder = os.path.join(self.tmp.name, "revised")
+        self.sent = []
+
+        checkpoint, store.checkpoint = store.checkpoint, False
+        self.addCleanup(setattr, store, "checkpoint", checkpoint)
+        self.addCleanup(store.forget, self.input_folder)
+        self.addCleanup(store.forget, self.output_folder)
+        self.addCleanup(self.tmp.cleanup)
+        for patcher in (
+            mock.patch.object(self.batch, "BATCH_DIR", os.path.join(self.tmp.name, "batches")),
+            mock.patch.object(self.batch.time, "sleep", lambda seconds: None),
+            mock.patch.object(qa_ai.dispatcher, "send", self.send),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def send(self, client, request):
+        """The synchronous fallback, answered like the batch endpoints."""
+        self.sent.append(request)
+        return ChatCompletion.model_validate(completion(request))
+
+    def save_board(self, name, units):
+        notes = [
+            {
+                "item_id": f"{name}-{index}",
+                "date": "2024-05-01",
+                "start_time": "10:00 AM",
+                "end_time": "11:00 AM",
+                "service_type": "Housing Search",
+                "service_line": "Housing Transition",
+                "provided_as": "Direct/In Person",
+                "manual_units": str(count),
+                "update_text_body": f"{name} note {index}",
+            }
+            for index, count in enumerate(units)
+        ]
+        store.save(
+            os.path.join(self.input_folder, f"{name}.json"),
+            {"notes": notes, "call_transcripts": []},
+        )
+
+    def run_batch_mode(self, client):
+        with mock.patch.object(self.batch, "client", client):
+            self.batch.process_files(self.input_folder, [self.output_folder])
+        return {
+            name: store.load(os.path.join(self.output_folder, name))["notes"]
+            for name in store.listdir(self.output_folder)
+        }
+
+    def test_completions_are_matched_to_their_notes_by_custom_id(self):
+        self.save_board("a", [2, 8, 1])
+        self.save_board("b", [6])
+        client = FakeOpenAI()
+
+        boards = self.run_batch_mode(client)
+
+        self.assertEqual(self.sent, [])
+        # The labels and the first passes go in one batch, the rewrites of
+        # the overbilled notes in a second one
+        self.assertEqual(len(client.batches_created), 2)
+        for line in client.batches_created[0]:
+            self.assertEqual(line["custom_id"], qa_ai.ResponseCache.key(line["body"]))
+        rewritten = [
+            note["update_text_body"]
+            for line in client.batches_created[1]
+            for note in prompt_notes(line["body"])
+        ]
+        self.assertEqual(sorted(rewritten), ["a note 1", "b note 0"])
+
+        for name, notes in boards.items():
+            for note in notes:
+                body = note["update_text_body"]
+                self.assertEqual(note["transcript_reason"], f"reason of {body}")
+                self.assertEqual(note["service_reason"], f"reason of {body}")
+                self.assertEqual(note["billing_reason"], f"billing_reason of {body}")
+                if int(note["manual_units"]) > 4:
+                    self.assertEqual(note["billing_severity"], "overbilled")
+                    self.assertEqual(note["billing_improved"], f"billing_improved of {body}")
+                else:
+                    self.assertEqual(note["billing_severity"], "good")
+                    self.assertEqual(note["billing_improved"], "not required")
+
+    def test_requests_missing_from_an_expired_batch_are_sent_synchronously(self):
+        self.save_board("a", [2, 3])
+        client = FakeOpenAI(status="expired", failures=1)
+
+        boards = self.run_batch_mode(client)
+
+        self.assertEqual(len(self.sent), 1)
+        failed_id = client.batches_created[0][0]["custom_id"]
+        self.assertEqual(qa_ai.ResponseCache.key(self.sent[0]), failed_id)
+        for note in boards["a.json"]:
+            body = note["update_text_body"]
+            self.assertEqual(note["transcript_reason"], f"reason of {body}")
+            self.assertEqual(note["service_reason"], f"reason of {body}")
+            self.assertEqual(note["billing_severity"], "good")
+
+    def test_a_restarted_run_resumes_the_submitted_batch(self):
+        self.save_board("a", [2])
+        bundles = {"a.json": store.load(os.path.join(self.input_folder, "a.json"))}
+        client = FakeOpenAI(polls=2)
+
+        with mock.patch.object(self.batch, "client", client):
+            requests = self.batch.collect_requests(bundles)
+            batch_id, state_path, input_path = self.batch.submit_batch(requests)
+            # A rerun after a crash finds the state file instead of submitting again
+            resumed_id, _, _ = self.batch.submit_batch(self.batch.collect_requests(bundles))
+            self.assertEqual(resumed_id, batch_id)
+            self.assertEqual(len(client.batches_created), 1)
+
+            self.batch.run_batch(requests)
+        self.addCleanup(qa_ai.batch_collector.results.clear)
+
+        self.assertEqual(set(qa_ai.batch_collector.results), set(requests))
+        self.assertFalse(os.path.exists(state_path))
+        self.assertFalse(os.path.exists(input_path))
+
+
+if __name__ == "__main__":
+    unittest.main()